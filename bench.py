@@ -0,0 +1,314 @@
+import argparse
+import glob
+import json
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from card_db import (CardCatalog, CardQuery, FuzzyIndex, build_database, build_thumbnail_atlases,
+                     load_catalog_snapshot, save_catalog_snapshot)
+from collection import Collection
+from deck import Deck, MAX_COPIES
+from deck_library import DeckLibrary
+from synergy import SynergyIndex
+
+# Filter combinations driven through CardQuery.search: (equals, name_filter, trait_filter, sort_option)
+FILTER_CASES = {
+    'all_by_cost': ({}, '', '', "Cost"),
+    'class': ({'class': "Forestcraft"}, '', '', "Cost"),
+    'class_type_cost': ({'class': "Dragoncraft", 'type': "Follower", 'cost': 3}, '', '', "Alphabetical"),
+    'name_substring': ({}, 'fairy', '', "Cost"),
+    'short_name': ({}, 'el', '', "Cost"),
+    'trait_substring': ({}, '', 'officer', "Release Order"),
+    'set_rarity_evolved': ({'card_set': "BP01", 'rarity': "Legendary", 'evolved': "no"}, '', '', "Release Order"),
+}
+
+# Fuzzy searches driven through FuzzyIndex.search: (name_filter, trait_filter), typos included
+FUZZY_CASES = {
+    'fuzzy_typo': ("titania sanctury", ''),
+    'fuzzy_word': ("fairy", ''),
+    'fuzzy_name_trait': ("knight", "offcer"),
+}
+
+# Thumbnails generated for the image benchmarks
+SYNTHETIC_THUMBNAILS = 200
+THUMBNAIL_SIZE = (120, 168)
+# Full-size art generated for the thumbnail pipeline benchmark
+SYNTHETIC_ART = 40
+ART_SIZE = (745, 1040)
+# Random decks of SYNERGY_DECK_CARDS distinct cards indexed for the synergy benchmark
+SYNERGY_DECKS = 2000
+SYNERGY_DECK_CARDS = 20
+# Library decks compared against a collection in the buildable/shortfall benchmark
+COLLECTION_DECKS = 500
+
+def measure(fn, repeat):
+    # Time fn over several runs, then run it once more under tracemalloc for its peak allocation
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'min_ms': min(times) * 1000, 'median_ms': statistics.median(times) * 1000,
+            'runs': repeat, 'peak_kib': peak / 1024}
+
+def generate_card_pool(source_dir, target_dir, scale):
+    # Write `scale` copies of every set file; copy k > 0 gets its own set name, codes and card names
+    os.makedirs(target_dir, exist_ok=True)
+    for filename in sorted(glob.glob(os.path.join(source_dir, "*.json"))):
+        with open(filename, 'r') as file:
+            cards = json.load(file)
+        for copy in range(scale):
+            if copy == 0:
+                scaled = cards
+            else:
+                scaled = []
+                for card in cards:
+                    card = dict(card)
+                    card_set = card.get('card_set', '')
+                    card['name'] = f"{card['name']} [{copy}]"
+                    card['code'] = card['code'].replace(card_set, f"{card_set}X{copy}", 1)
+                    card['card_set'] = f"{card_set}X{copy}"
+                    scaled.append(card)
+            target = os.path.join(target_dir, f"{copy:03d}_{os.path.basename(filename)}")
+            with open(target, 'w') as file:
+                json.dump(scaled, file)
+    return sorted(glob.glob(os.path.join(target_dir, "*.json")))
+
+def full_deck(catalog):
+    # A legal-looking deck: MAX_COPIES of the first cards of each section, 40 main and 10 evolved
+    deck = Deck(catalog)
+    for card in catalog:
+        section = deck.section_for(card.name)
+        limit = 10 if section is deck.evolved else 40
+        if sum(section.values()) + MAX_COPIES <= limit:
+            section[card.name] = MAX_COPIES
+    return deck
+
+def bench_database(work_dir, card_files, repeat):
+    db_name = os.path.join(work_dir, "bench.db")
+    results = {
+        'full_build': measure(lambda: build_database(card_files, db_name, rebuild=True), repeat),
+        'noop_build': measure(lambda: build_database(card_files, db_name), repeat),
+    }
+    # Touch one set with new content to time the incremental path
+    changed = card_files[len(card_files) // 2]
+    with open(changed, 'a') as file:
+        file.write(" ")
+    start = time.perf_counter()
+    build_database(card_files, db_name)
+    results['incremental_build_one_set_ms'] = (time.perf_counter() - start) * 1000
+    # Cold-start paths of the GUI: catalog from the database vs from a valid snapshot
+    snapshot = os.path.join(work_dir, "bench.snapshot")
+    save_catalog_snapshot(CardCatalog.load(db_name), card_files, snapshot)
+    results['catalog_from_db'] = measure(lambda: CardCatalog.load(db_name), repeat)
+    results['catalog_from_snapshot'] = measure(lambda: load_catalog_snapshot(card_files, snapshot, db_name), repeat)
+    return db_name, results
+
+def bench_filters(db_name, repeat):
+    conn = sqlite3.connect(db_name)
+    query = CardQuery(conn)
+    results = {'fts': query.has_fts}
+    for name, (equals, name_filter, trait_filter, sort_option) in FILTER_CASES.items():
+        matches = len(query.search(equals, name_filter, trait_filter, None, sort_option))
+        results[name] = dict(measure(lambda: query.search(equals, name_filter, trait_filter, None, sort_option),
+                                     repeat), matches=matches)
+    catalog = CardCatalog.from_db(conn.cursor())
+    conn.close()
+    start = time.perf_counter()
+    fuzzy = FuzzyIndex(catalog)
+    results['fuzzy_index_build_ms'] = (time.perf_counter() - start) * 1000
+    for name, (name_filter, trait_filter) in FUZZY_CASES.items():
+        matches = len(fuzzy.search(name_filter, trait_filter))
+        results[name] = dict(measure(lambda: fuzzy.search(name_filter, trait_filter), repeat), matches=matches)
+    return results
+
+def bench_deck(catalog, repeat):
+    deck = full_deck(catalog)
+    text = deck.to_text()
+    data = deck.to_bytes()
+    # Parsing alone, as in bulk imports. The binary format is about 3x smaller but not faster to
+    # read: both build one dict entry per card, and decoding varints in Python costs more than
+    # splitting text lines (binary_parse_speedup was about 0.65 on the scale 1 pool).
+    text_parse = measure(lambda: Deck.from_text(catalog, text), repeat)
+    binary_parse = measure(lambda: Deck.from_bytes(catalog, data), repeat)
+    return {
+        'text_parse': text_parse,
+        'binary_parse': binary_parse,
+        'binary_parse_speedup': text_parse['median_ms'] / binary_parse['median_ms'],
+        'catalog_load': measure(lambda: CardCatalog(list(catalog)), repeat),
+        'sorted_entries': measure(lambda: (deck.sorted_entries(deck.main), deck.sorted_entries(deck.evolved)), repeat),
+        'type_counts': measure(deck.type_counts, repeat),
+        'analyze': measure(deck.analyze, repeat),
+        'validate': measure(deck.validate, repeat),
+        'text_round_trip': measure(lambda: Deck.from_text(catalog, deck.to_text()), repeat),
+        'binary_round_trip': measure(lambda: Deck.from_bytes(catalog, deck.to_bytes()), repeat),
+        'text_bytes': len(text),
+        'binary_bytes': len(data),
+    }
+
+def bench_synergy(catalog, repeat):
+    # Co-occurrence matrix over random decks drawn from one class plus Neutral
+    rng = random.Random(0)
+    names_by_class = {}
+    for card in catalog:
+        names_by_class.setdefault(card.card_class, []).append(card.name)
+    neutral = names_by_class.pop("Neutral", [])
+    pools = [names + neutral for names in names_by_class.values()] or [neutral]
+    decks = []
+    for _ in range(SYNERGY_DECKS):
+        pool = rng.choice(pools)
+        decks.append(rng.sample(pool, min(SYNERGY_DECK_CARDS, len(pool))))
+    synergy = SynergyIndex()
+    start = time.perf_counter()
+    for key, card_names in enumerate(decks):
+        synergy.add(key, card_names)
+    results = {'decks': len(decks), 'build_ms': (time.perf_counter() - start) * 1000}
+    deck = {card_name: MAX_COPIES for card_name in decks[0]}
+    results['suggest'] = measure(lambda: synergy.suggest(deck), repeat)
+    # Re-indexing one deck (what a library sync does per changed deck) followed by a query
+    results['add_deck_and_suggest'] = measure(lambda: (synergy.add(len(decks), decks[1]), synergy.suggest(deck)), repeat)
+    return results
+
+def bench_collection(work_dir, catalog, repeat):
+    # Buildable decks and shortfall of a library of random decks against a collection owning
+    # MAX_COPIES of every other card
+    rng = random.Random(0)
+    names = [card.name for card in catalog]
+    collection_db = os.path.join(work_dir, "bench_collection.db")
+    collection = Collection(collection_db)
+    collection.update({card.code: MAX_COPIES for card in list(catalog)[::2]})
+    collection.close()
+    library = DeckLibrary(catalog, os.path.join(work_dir, "bench_decks.db"), collection_db=collection_db)
+    try:
+        for index in range(COLLECTION_DECKS):
+            deck = Deck(catalog)
+            for card_name in rng.sample(names, min(SYNERGY_DECK_CARDS, len(names))):
+                deck.section_for(card_name)[card_name] = rng.randint(1, MAX_COPIES)
+            library.add(deck, f"deck {index}")
+        return {
+            'decks': len(library),
+            'buildable': measure(lambda: library.buildable(max_missing=None), repeat),
+            'shortfall': measure(library.shortfall, repeat),
+        }
+    finally:
+        library.close()
+
+def bench_images(work_dir, catalog, repeat):
+    try:
+        from PIL import Image
+        import main_onfilter
+        import thumbnails
+    except ImportError as e:
+        return {'skipped': f"image benchmarks need PIL and Tk: {e}"}
+    image_dir = os.path.join(work_dir, "card_images")
+    os.makedirs(image_dir, exist_ok=True)
+    codes = [card.code for card in list(catalog)[:SYNTHETIC_THUMBNAILS]]
+    for code in codes:
+        Image.new('RGB', THUMBNAIL_SIZE, (90, 60, 30)).save(os.path.join(image_dir, f"{code}_mini.png"))
+    atlas_dir = os.path.join(image_dir, "atlas")
+
+    def decode_files():
+        for code in codes:
+            with Image.open(os.path.join(image_dir, f"{code}_mini.png")) as image:
+                image.load()
+
+    results = {'thumbnails': len(codes), 'png_decode': measure(decode_files, repeat)}
+    results['atlas_build'] = measure(
+        lambda: (shutil.rmtree(atlas_dir, ignore_errors=True),
+                 build_thumbnail_atlases(os.path.join(work_dir, "bench.db"), image_dir, atlas_dir)),
+        1)
+    atlas = main_onfilter.ThumbnailAtlas(atlas_dir)
+    results['atlas_slice'] = measure(lambda: [atlas.get(code) for code in codes], repeat)
+    atlas.close()
+
+    art_dir = os.path.join(work_dir, "card_art")
+    os.makedirs(art_dir, exist_ok=True)
+    for i, code in enumerate(codes[:SYNTHETIC_ART]):
+        Image.linear_gradient('L').resize(ART_SIZE).convert('RGB').rotate(i).save(os.path.join(art_dir, f"{code}.png"))
+    results['thumbnail_pipeline'] = thumbnails.generate_thumbnails(art_dir, force=True)
+    results['thumbnail_pipeline_noop'] = thumbnails.generate_thumbnails(art_dir)
+    return results
+
+def bench_gui(work_dir, catalog, repeat):
+    # Grid and deck display timings need a display, e.g. run under xvfb-run
+    try:
+        import tkinter as tk
+        import main_onfilter
+        root = tk.Tk()
+    except Exception as e:
+        return {'skipped': f"no display available: {e}"}
+    root.withdraw()
+    cwd = os.getcwd()
+    os.chdir(work_dir)
+    try:
+        shutil.copy("bench.db", "cards.db")
+        app = main_onfilter.DeckBuilderApp(root)
+        root.update()
+
+        def refresh(class_name):
+            app.class_var.set(class_name)
+            app.update_card_list()
+            # Results reach the grid through the Tk event loop, so keep it running until they did
+            while app.query_worker.busy():
+                root.update()
+                time.sleep(0.001)
+
+        results = {
+            'grid_refresh_all': measure(lambda: refresh("All"), repeat),
+            'grid_refresh_class': measure(lambda: refresh("Forestcraft"), repeat),
+        }
+        app.deck.replace(full_deck(app.catalog))
+        results['update_deck_display'] = measure(app.update_deck_display, repeat)
+        results['update_totals'] = measure(app.update_totals, repeat)
+        return results
+    finally:
+        root.destroy()
+        os.chdir(cwd)
+
+def run(scale, repeat, sets_dir):
+    with tempfile.TemporaryDirectory() as work_dir:
+        start = time.perf_counter()
+        card_files = generate_card_pool(sets_dir, os.path.join(work_dir, "sets_db"), scale)
+        result = {'scale': scale, 'set_files': len(card_files),
+                  'generate_ms': (time.perf_counter() - start) * 1000}
+        db_name, result['database'] = bench_database(work_dir, card_files, repeat)
+        catalog = CardCatalog.load(db_name)
+        result['cards'] = len(catalog)
+        result['filters'] = bench_filters(db_name, repeat)
+        result['deck'] = bench_deck(catalog, repeat)
+        result['synergy'] = bench_synergy(catalog, repeat)
+        result['collection'] = bench_collection(work_dir, catalog, repeat)
+        result['images'] = bench_images(work_dir, catalog, repeat)
+        result['gui'] = bench_gui(work_dir, catalog, repeat)
+        return result
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the deck builder on synthetic card pools")
+    parser.add_argument("--scale", type=int, nargs="+", default=[1, 10], help="card pool multipliers (default: 1 10)")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per benchmark")
+    parser.add_argument("--sets", default="sets_db", help="directory of set JSON files to scale")
+    parser.add_argument("-o", "--output", help="write the JSON report to this file instead of stdout")
+    args = parser.parse_args(argv)
+
+    report = {'python': sys.version.split()[0], 'runs': [run(scale, args.repeat, args.sets) for scale in args.scale]}
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
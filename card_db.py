@@ -0,0 +1,672 @@
+import sqlite3
+import json
+import os
+import re
+import hashlib
+import pickle
+from pathlib import Path
+from collections import Counter, namedtuple
+from itertools import islice
+
+class Card:
+    # Compact in-memory record for one row of the cards table
+    __slots__ = ('name', 'cost', 'attack', 'defense', 'type', 'universe', 'rarity',
+                 'code', 'card_class', 'trait', 'evolved', 'card_set')
+
+    COLUMNS = "name, cost, attack, defense, type, universe, rarity, code, class, trait, evolved, card_set"
+
+    def __init__(self, name, cost, attack, defense, type, universe, rarity, code, card_class, trait, evolved, card_set):
+        self.name = name
+        self.cost = cost
+        self.attack = attack
+        self.defense = defense
+        self.type = type
+        self.universe = universe
+        self.rarity = rarity
+        self.code = code
+        self.card_class = card_class
+        self.trait = trait
+        self.evolved = evolved
+        self.card_set = card_set
+
+def connect_read_only(db_name='cards.db'):
+    # Read-only connection (mode=ro URI) that may be handed to a worker thread; with the database
+    # in WAL mode readers never block, or get blocked by, a build running at the same time
+    uri = f"{Path(os.path.abspath(db_name)).as_uri()}?mode=ro"
+    return sqlite3.connect(uri, uri=True, check_same_thread=False)
+
+class CardCatalog:
+    # Whole cards table held in memory and keyed by name for O(1) metadata lookups
+    def __init__(self, cards):
+        self.by_name = {card.name: card for card in cards}
+        self.by_code = {card.code: card for card in self.by_name.values()}
+
+    @classmethod
+    def from_db(cls, cursor):
+        # Load every card with a single query
+        cursor.execute(f"SELECT {Card.COLUMNS} FROM cards")
+        return cls(Card(*row) for row in cursor.fetchall())
+
+    @classmethod
+    def load(cls, db_name='cards.db'):
+        # Load the catalog from a database file without keeping the connection open
+        conn = sqlite3.connect(db_name)
+        try:
+            return cls.from_db(conn.cursor())
+        finally:
+            conn.close()
+
+    def get(self, name):
+        return self.by_name.get(name)
+
+    def get_by_code(self, code):
+        return self.by_code.get(code)
+
+    def __contains__(self, name):
+        return name in self.by_name
+
+    def __iter__(self):
+        return iter(self.by_name.values())
+
+    def __len__(self):
+        return len(self.by_name)
+
+class CardQuery:
+    # Filter engine over the indexed cards table. The SQL text only depends on which
+    # filters are active, so sqlite3's statement cache keeps reusing the prepared statements.
+    EQUALITY_COLUMNS = ('class', 'type', 'universe', 'card_set', 'rarity', 'evolved', 'cost')
+    ORDER_BY = {
+        "Cost": "cost, source, code",
+        "Alphabetical": "name",
+        # Set files are named in release order, codes are sequential within a set
+        "Release Order": "source, code",
+    }
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.has_fts = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name='cards_fts'").fetchone() is not None
+
+    def search(self, equals, name_filter='', trait_filter='', names=None, sort_option="Cost", columns="name, cost"):
+        # Return the rows matching every active filter, sorted by SQLite
+        clauses = []
+        parameters = []
+        for column in self.EQUALITY_COLUMNS:
+            value = equals.get(column)
+            if value is not None and value != '':
+                clauses.append(f"{column}=?")
+                parameters.append(value)
+
+        text_clauses = []
+        if name_filter:
+            text_clauses.append("name LIKE ?")
+            parameters.append(f"%{name_filter}%")
+        if trait_filter:
+            text_clauses.append("trait LIKE ?")
+            parameters.append(f"%{trait_filter}%")
+        if text_clauses and self.has_fts:
+            # LIKE on the trigram FTS table is answered from the index for patterns of 3+ characters
+            clauses.append("rowid IN (SELECT rowid FROM cards_fts WHERE {})".format(" AND ".join(text_clauses)))
+        else:
+            clauses.extend(text_clauses)
+
+        if names:
+            clauses.append("name IN ({seq})".format(seq=','.join(['?'] * len(names))))
+            parameters.extend(names)
+
+        query = f"SELECT {columns} FROM cards"
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY " + self.ORDER_BY.get(sort_option, self.ORDER_BY["Cost"])
+        return self.conn.execute(query, parameters).fetchall()
+
+class FacetIndex:
+    # Bitsets over the catalog (bit i is the i-th card) for every value of every filter attribute,
+    # so match counts for all combobox values come from a few big-integer ANDs and popcounts.
+    ATTRIBUTES = {'class': 'card_class', 'card_set': 'card_set', 'type': 'type', 'universe': 'universe',
+                  'rarity': 'rarity', 'evolved': 'evolved', 'cost': 'cost'}
+
+    def __init__(self, catalog):
+        cards = list(catalog)
+        self.names = [card.name for card in cards]
+        self.position = {name: i for i, name in enumerate(self.names)}
+        self.lower_names = [card.name.lower() for card in cards]
+        self.lower_traits = [(card.trait or '').lower() for card in cards]
+        self.all = (1 << len(cards)) - 1
+        self.bits = {}
+        for facet, attribute in self.ATTRIBUTES.items():
+            positions = {}
+            for i, card in enumerate(cards):
+                positions.setdefault(getattr(card, attribute), []).append(i)
+            self.bits[facet] = {value: self.mask_of(indices) for value, indices in positions.items()}
+        self.text_cache = {}
+
+    def mask_of(self, indices):
+        # Build a bitset from card positions
+        bitmap = bytearray((len(self.names) + 7) // 8)
+        for i in indices:
+            bitmap[i >> 3] |= 1 << (i & 7)
+        return int.from_bytes(bitmap, 'little')
+
+    def values(self, facet):
+        # Distinct values of an attribute in catalog (release) order
+        return list(self.bits[facet])
+
+    def text_mask(self, name_filter='', trait_filter=''):
+        # Cards whose name and trait contain the (case-insensitive) filter text
+        key = (name_filter.lower(), trait_filter.lower())
+        cached = self.text_cache
+        if key in cached:
+            return cached[key]
+        name_text, trait_text = key
+        mask = self.mask_of(i for i in range(len(self.names))
+                            if name_text in self.lower_names[i] and trait_text in self.lower_traits[i])
+        # Replaced rather than updated, so query threads never see a half-written cache
+        self.text_cache = {key: mask}
+        return mask
+
+    def counts(self, equals, name_filter='', trait_filter='', names=None, text_matches=None):
+        # Match counts for every value of every facet under the current filters.
+        # Each facet ignores its own selection, so the counts say what choosing another value would give.
+        # text_matches replaces the substring filters with the names found by another matcher (fuzzy search).
+        base = self.all
+        if text_matches is not None:
+            base &= self.mask_of(self.position[name] for name in text_matches if name in self.position)
+        elif name_filter or trait_filter:
+            base &= self.text_mask(name_filter, trait_filter)
+        if names:
+            base &= self.mask_of(self.position[name] for name in names if name in self.position)
+        selected = {}
+        for facet in self.bits:
+            value = equals.get(facet)
+            if value is not None and value != '':
+                selected[facet] = self.bits[facet].get(value, 0)
+        counts = {}
+        for facet, value_bits in self.bits.items():
+            mask = base
+            for other, bits in selected.items():
+                if other != facet:
+                    mask &= bits
+            counts[facet] = {value: (bits & mask).bit_count() for value, bits in value_bits.items()}
+        return counts
+
+# Share of the query's trigrams a card has to contain to count as a fuzzy match
+FUZZY_MIN_SCORE = 0.5
+NON_WORD = re.compile(r"[^\w ]+")
+
+def fuzzy_key(text):
+    # Lowercase with punctuation dropped and whitespace collapsed, so "Titanias" meets "Titania's"
+    return " ".join(NON_WORD.sub("", text.lower()).split())
+
+def trigrams(text):
+    # Trigrams of a normalized string, padded so word starts and short queries still produce grams
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class FuzzyIndex:
+    # Trigram postings (lists of catalog positions) over card names and traits, built once from
+    # the catalog. Queries count shared trigrams per card and rank by coverage of
+    # the query, so typos and missing punctuation still match and the best matches come first.
+    def __init__(self, catalog):
+        cards = list(catalog)
+        self.names = [card.name for card in cards]
+        self.name_keys = [fuzzy_key(card.name) for card in cards]
+        self.trait_keys = [fuzzy_key(card.trait or '') for card in cards]
+        self.name_postings = self.build_postings(self.name_keys)
+        self.trait_postings = self.build_postings(self.trait_keys)
+        self.name_gram_counts = [len(trigrams(key)) for key in self.name_keys]
+
+    @staticmethod
+    def build_postings(keys):
+        postings = {}
+        for i, key in enumerate(keys):
+            if key:
+                for gram in trigrams(key):
+                    postings.setdefault(gram, []).append(i)
+        return postings
+
+    @staticmethod
+    def scores(query, keys, postings):
+        # {position: share of the query trigrams found} for cards reaching FUZZY_MIN_SCORE;
+        # an exact substring always scores 1
+        query = fuzzy_key(query)
+        if len(query) < 3:
+            # Too short for trigrams to say anything, plain substring matching
+            return {i: 1.0 for i, key in enumerate(keys) if query in key}
+        grams = trigrams(query)
+        hits = Counter()
+        for gram in grams:
+            hits.update(postings.get(gram, ()))
+        needed = len(grams) * FUZZY_MIN_SCORE
+        return {i: 1.0 if query in keys[i] else count / len(grams)
+                for i, count in hits.items() if count >= needed or query in keys[i]}
+
+    def search(self, name_filter='', trait_filter='', limit=None):
+        # Card names ranked by match quality (best first); both filters have to match when given.
+        # Ties prefer names close to the query length, then alphabetical order.
+        combined = None
+        for query, keys, postings in ((name_filter, self.name_keys, self.name_postings),
+                                      (trait_filter, self.trait_keys, self.trait_postings)):
+            if not query.strip():
+                continue
+            found = self.scores(query, keys, postings)
+            if combined is None:
+                combined = found
+            else:
+                combined = {i: score + found[i] for i, score in combined.items() if i in found}
+        if combined is None:
+            return []
+        query_grams = len(trigrams(fuzzy_key(name_filter))) if name_filter.strip() else 0
+        ranked = sorted(combined, key=lambda i: (-combined[i], abs(self.name_gram_counts[i] - query_grams),
+                                                 self.names[i]))
+        return [self.names[i] for i in ranked[:limit]]
+
+# Set files are read this many characters at a time and their cards inserted in batches, so
+# memory stays bounded by one chunk, one batch and the codes seen so far
+READ_CHUNK = 1 << 16
+INSERT_BATCH = 500
+# A single card larger than this is treated as a broken file rather than buffered further
+MAX_CARD_CHARS = 1 << 20
+
+# Problem with one card (or the whole file, line of the failure) found while importing a set file
+CardError = namedtuple('CardError', 'filename line message')
+
+WHITESPACE = re.compile(r'\s*')
+
+class SetFileError(ValueError):
+    # Malformed set file; line is where reading stopped
+    def __init__(self, line, message):
+        super().__init__(f"line {line}: {message}")
+        self.line = line
+        self.message = message
+
+def iter_json_array(file, chunk_size=READ_CHUNK):
+    # Yield (line, value) for every element of the top-level JSON array in a text file,
+    # decoding one element at a time. Raises SetFileError at the line of malformed input.
+    decoder = json.JSONDecoder()
+    buffer = file.read(chunk_size)
+    at_end = not buffer
+    position = 0
+    line = 1
+    state = 'open'
+    while True:
+        match = WHITESPACE.match(buffer, position)
+        line += buffer.count('\n', position, match.end())
+        position = match.end()
+        if position == len(buffer):
+            buffer = file.read(chunk_size)
+            position = 0
+            if not buffer:
+                raise SetFileError(line, "unexpected end of file")
+            continue
+
+        char = buffer[position]
+        if state == 'open':
+            if char != '[':
+                raise SetFileError(line, "expected a JSON array of cards")
+            position += 1
+            state = 'first'
+        elif char == ']' and state in ('first', 'next'):
+            return
+        elif state == 'next':
+            if char != ',':
+                raise SetFileError(line, "expected ',' or ']' between cards")
+            position += 1
+            state = 'value'
+        else:
+            # Decode one element, reading more input while it is cut off by the end of the buffer
+            while True:
+                try:
+                    value, end = decoder.raw_decode(buffer, position)
+                    if end < len(buffer) or at_end:
+                        break
+                except json.JSONDecodeError as e:
+                    if at_end or len(buffer) - position > MAX_CARD_CHARS:
+                        raise SetFileError(line + buffer.count('\n', position, e.pos), e.msg) from None
+                more = file.read(chunk_size)
+                at_end = not more
+                buffer = buffer[position:] + more
+                position = 0
+            yield line, value
+            line += buffer.count('\n', position, end)
+            position = end
+            state = 'next'
+        if position > chunk_size:
+            buffer = buffer[position:]
+            position = 0
+
+def to_int(value, field):
+    # Numbers in set files come as ints or numeric strings
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise ValueError(f"{field} must be a number, got {value!r}")
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"{field} must be a number, got {value!r}") from None
+
+def to_bool(value, field):
+    # Accept the "yes"/"no" of the official dumps as well as JSON booleans and common spellings
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in ('yes', 'true', '1'):
+        return True
+    if text in ('no', 'false', '0', ''):
+        return False
+    raise ValueError(f"{field} must be yes/no, got {value!r}")
+
+REQUIRED_FIELDS = ('name', 'type', 'code', 'class')
+TEXT_FIELDS = ('name', 'type', 'code', 'class', 'universe', 'rarity', 'trait', 'card_set')
+
+def normalize_card(card):
+    # Validate a card from a set file and return a copy with numeric cost/attack/defense,
+    # evolved as a bool and stripped text fields. Raises ValueError describing the problem.
+    if not isinstance(card, dict):
+        raise ValueError(f"expected a card object, got {type(card).__name__}")
+    missing = [field for field in REQUIRED_FIELDS if not card.get(field)]
+    if missing:
+        raise ValueError(f"missing {', '.join(missing)}")
+    normalized = {}
+    for field in TEXT_FIELDS:
+        value = card.get(field) or ''
+        if not isinstance(value, str):
+            raise ValueError(f"{field} must be text, got {value!r}")
+        normalized[field] = value.strip()
+    normalized['cost'] = to_int(card.get('cost') or 0, 'cost')
+    if normalized['cost'] < 0:
+        raise ValueError(f"cost must not be negative, got {normalized['cost']}")
+    for field in ('attack', 'defense'):
+        value = card.get(field)
+        normalized[field] = None if value is None or value == '' else to_int(value, field)
+    normalized['evolved'] = to_bool(card.get('evolved', 'no'), 'evolved')
+    return normalized
+
+def load_set_file(filename, seen_codes, errors, duplicates=None):
+    # Stream the validated cards of one set file. Invalid cards and codes already in seen_codes
+    # (code -> defining file) are skipped and reported to errors as CardError; the skipped
+    # duplicate codes are also appended to duplicates when a list is given.
+    with open(filename, 'r', encoding='utf-8-sig') as file:
+        try:
+            for line, card in iter_json_array(file):
+                try:
+                    card = normalize_card(card)
+                except ValueError as e:
+                    errors.append(CardError(filename, line, str(e)))
+                    continue
+                first = seen_codes.get(card['code'])
+                if first is not None:
+                    errors.append(CardError(filename, line, f"duplicate code {card['code']} (first in {first})"))
+                    if duplicates is not None:
+                        duplicates.append(card['code'])
+                    continue
+                seen_codes[card['code']] = filename
+                yield card
+        except SetFileError as e:
+            errors.append(CardError(filename, e.line, e.message))
+        except UnicodeDecodeError as e:
+            errors.append(CardError(filename, None, f"not UTF-8 text: {e.reason}"))
+
+# Bump when the layout of the cards or set_files tables changes to force a full rebuild
+SCHEMA_VERSION = 3
+
+def card_row(card, source=''):
+    # Convert a normalized card into a row for the cards table; evolved is stored as the
+    # "yes"/"no" the filters and deck routing compare against
+    return (card['name'], card['cost'], card['attack'], card['defense'],
+            card['type'], card['universe'], card['rarity'], card['code'],
+            card['class'], card['trait'], "yes" if card['evolved'] else "no", card['card_set'], source)
+
+def insert_cards(c, cards, source=''):
+    # Insert cards in fixed-size batches so a streamed file is never materialized whole
+    rows = (card_row(card, source) for card in cards)
+    while True:
+        batch = list(islice(rows, INSERT_BATCH))
+        if not batch:
+            break
+        c.executemany('''INSERT INTO cards VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?)''', batch)
+
+def create_tables(c):
+    # (Re)create the cards table and the per-file build metadata
+    c.execute('''DROP TABLE IF EXISTS cards''')
+    c.execute('''DROP TABLE IF EXISTS set_files''')
+    c.execute('''CREATE TABLE cards
+                 (name TEXT, cost INTEGER, attack INTEGER, defense INTEGER, type TEXT, 
+                 universe TEXT, rarity TEXT, code TEXT, class TEXT, trait TEXT, evolved TEXT, card_set TEXT,
+                 source TEXT)''')
+    c.execute('''CREATE TABLE set_files
+                 (filename TEXT PRIMARY KEY, mtime REAL, size INTEGER, hash TEXT, duplicates INTEGER)''')
+    c.execute('''DROP TABLE IF EXISTS cards_fts''')
+    c.execute('''CREATE INDEX idx_cards_source ON cards (source)''')
+    c.execute('''CREATE INDEX idx_cards_name ON cards (name)''')
+    for column in CardQuery.EQUALITY_COLUMNS:
+        c.execute(f"CREATE INDEX idx_cards_{column} ON cards ({column})")
+    try:
+        # Trigram index for the name/trait substring filters (needs SQLite 3.34+ with FTS5)
+        c.execute('''CREATE VIRTUAL TABLE cards_fts USING fts5
+                     (name, trait, content='cards', tokenize='trigram')''')
+    except sqlite3.OperationalError as e:
+        print(f"Substring index unavailable, falling back to table scans: {e}")
+    c.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+def refresh_search_index(c):
+    # Rebuild the external-content FTS table after the cards table changed
+    if c.execute("SELECT 1 FROM sqlite_master WHERE name='cards_fts'").fetchone():
+        c.execute("INSERT INTO cards_fts(cards_fts) VALUES('rebuild')")
+
+def file_digest(filename):
+    # Hash the content of a set file so touched-but-identical files are not re-imported
+    with open(filename, 'rb') as file:
+        return hashlib.sha1(file.read()).hexdigest()
+
+class IncrementalConflict(Exception):
+    # Raised to roll back an incremental import that ran into a duplicate code
+    pass
+
+def import_set_files(c, imports, removed, errors, incremental):
+    # Drop the cards of removed and re-imported set files, then stream in the imports given as
+    # (filename, mtime, size, hash). A full build lets the first file defining a code win. An
+    # incremental import can't reproduce that order against the files it keeps, so it raises
+    # IncrementalConflict on the first duplicate code instead.
+    for filename in removed:
+        c.execute("DELETE FROM cards WHERE source=?", (filename,))
+        c.execute("DELETE FROM set_files WHERE filename=?", (filename,))
+    for filename, _, _, _ in imports:
+        c.execute("DELETE FROM cards WHERE source=?", (filename,))
+    seen_codes = dict(c.execute("SELECT code, source FROM cards"))
+    for filename, mtime, size, digest in imports:
+        duplicates = []
+        insert_cards(c, load_set_file(filename, seen_codes, errors, duplicates), filename)
+        if duplicates and incremental:
+            raise IncrementalConflict(filename)
+        c.execute("INSERT OR REPLACE INTO set_files VALUES (?,?,?,?,?)",
+                  (filename, mtime, size, digest, len(duplicates)))
+
+def build_database(filenames, db_name='cards.db', rebuild=False, errors=None):
+    # Incrementally import only the set files that changed since the last build.
+    # Returns the list of re-imported files (empty when the database was up to date).
+    # Rejected cards are appended to errors as CardError, or printed when no list is given.
+    conn = sqlite3.connect(db_name)
+    c = conn.cursor()
+    try:
+        # WAL lets the GUI's read-only connections keep reading while a build writes
+        c.execute("PRAGMA journal_mode=WAL")
+        if rebuild or c.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            known = {}
+            rebuild = True
+        else:
+            c.execute("SELECT filename, mtime, size, hash, duplicates FROM set_files")
+            known = {row[0]: row[1:] for row in c.fetchall()}
+
+        changed = []
+        touched = []
+        for filename in filenames:
+            stat = os.stat(filename)
+            previous = known.get(filename)
+            if previous and previous[0] == stat.st_mtime and previous[1] == stat.st_size:
+                continue
+            digest = file_digest(filename)
+            if previous and previous[2] == digest:
+                # Same content with a new mtime, only the metadata needs refreshing
+                touched.append((stat.st_mtime, stat.st_size, filename))
+            else:
+                changed.append((filename, stat.st_mtime, stat.st_size, digest))
+        removed = [filename for filename in known if filename not in filenames]
+
+        if not (rebuild or changed or touched or removed):
+            return []
+        # Once the database holds rejected duplicates, which file owns a code depends on files the
+        # incremental path would keep as they are, so any content change rebuilds everything
+        if (changed or removed) and any(previous[3] for previous in known.values()):
+            rebuild = True
+
+        file_errors = []
+        if not rebuild:
+            try:
+                with conn:
+                    import_set_files(c, changed, removed, file_errors, incremental=True)
+                    c.executemany("UPDATE set_files SET mtime=?, size=? WHERE filename=?", touched)
+                    if changed or removed:
+                        refresh_search_index(c)
+            except IncrementalConflict:
+                rebuild = True
+                file_errors = []
+        if rebuild:
+            changed = []
+            for filename in filenames:
+                stat = os.stat(filename)
+                changed.append((filename, stat.st_mtime, stat.st_size, file_digest(filename)))
+            with conn:
+                create_tables(c)
+                import_set_files(c, changed, [], file_errors, incremental=False)
+                refresh_search_index(c)
+
+        if errors is not None:
+            errors.extend(file_errors)
+        else:
+            for error in file_errors:
+                print(f"{error.filename}:{error.line}: {error.message}")
+        return [filename for filename, _, _, _ in changed]
+    finally:
+        conn.close()
+
+# Per-set packed thumbnails for the GUI grid: raw RGBA blobs plus a JSON offset index,
+# {card_set}_{suffix}.rgba and .json for each thumbnail variant that is packed
+ATLAS_DIR = "card_images/atlas"
+
+def build_thumbnail_atlases(db_name='cards.db', image_dir='card_images', atlas_dir=ATLAS_DIR, suffix='mini'):
+    # Pack each set's _{suffix}.png thumbnails into one raw RGBA blob with an offset index.
+    # A set is only repacked when its thumbnails changed since the atlas was written.
+    from PIL import Image
+    conn = connect_read_only(db_name)
+    try:
+        codes_by_set = {}
+        for card_set, code in conn.execute("SELECT card_set, code FROM cards ORDER BY card_set, code"):
+            codes_by_set.setdefault(card_set, []).append(code)
+    finally:
+        conn.close()
+
+    os.makedirs(atlas_dir, exist_ok=True)
+    rebuilt = []
+    for card_set, codes in codes_by_set.items():
+        sources = {}
+        for code in codes:
+            path = os.path.join(image_dir, f"{code}_{suffix}.png")
+            if os.path.exists(path):
+                sources[code] = path
+        index_file = os.path.join(atlas_dir, f"{card_set}_{suffix}.json")
+        blob_file = os.path.join(atlas_dir, f"{card_set}_{suffix}.rgba")
+        if os.path.exists(index_file) and os.path.exists(blob_file):
+            with open(index_file, 'r') as file:
+                atlas = json.load(file)
+            # Thumbnails that could not be packed count as done until their file changes
+            attempted = set(atlas['cards']) | set(atlas.get('failed', ()))
+            atlas_mtime = os.path.getmtime(index_file)
+            if attempted == set(sources) and all(os.path.getmtime(path) <= atlas_mtime for path in sources.values()):
+                continue
+
+        index = {}
+        failed = []
+        offset = 0
+        with open(blob_file + ".tmp", 'wb') as blob:
+            for code, path in sources.items():
+                try:
+                    with Image.open(path) as image:
+                        data = image.convert('RGBA').tobytes()
+                        width, height = image.size
+                except Exception as e:
+                    print(f"Error packing thumbnail {path}: {e}")
+                    failed.append(code)
+                    continue
+                blob.write(data)
+                index[code] = (offset, width, height)
+                offset += len(data)
+        with open(index_file + ".tmp", 'w') as file:
+            json.dump({'cards': index, 'failed': failed}, file)
+        os.replace(blob_file + ".tmp", blob_file)
+        os.replace(index_file + ".tmp", index_file)
+        rebuilt.append(card_set)
+    return rebuilt
+
+# Pickled catalog written after a build. While the set files still match the states it was taken
+# from, the GUI starts from it instead of checking the build and querying the cards table.
+CATALOG_SNAPSHOT = "cards.snapshot"
+SNAPSHOT_VERSION = 1
+
+def set_file_states(filenames, known=None):
+    # {filename: (mtime, size, hash)} of the set files; hashes in `known` are reused for files
+    # whose mtime and size did not change, so only touched files are read
+    known = known or {}
+    states = {}
+    for filename in filenames:
+        stat = os.stat(filename)
+        previous = known.get(filename)
+        if previous and previous[0] == stat.st_mtime and previous[1] == stat.st_size:
+            states[filename] = previous
+        else:
+            states[filename] = (stat.st_mtime, stat.st_size, file_digest(filename))
+    return states
+
+def save_catalog_snapshot(catalog, filenames, path=CATALOG_SNAPSHOT):
+    # Written to a temporary file first, a crash mid-write leaves the previous snapshot intact
+    snapshot = {
+        'version': (SNAPSHOT_VERSION, SCHEMA_VERSION),
+        'files': set_file_states(filenames),
+        'cards': [tuple(getattr(card, slot) for slot in Card.__slots__) for card in catalog],
+    }
+    temporary = path + ".tmp"
+    with open(temporary, 'wb') as file:
+        pickle.dump(snapshot, file, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temporary, path)
+
+def database_set_hashes(db_name):
+    # {filename: hash} of the set files a database was built from, None when it is missing or
+    # has another schema (e.g. an older cards.db restored from version control)
+    if not os.path.exists(db_name):
+        return None
+    conn = connect_read_only(db_name)
+    try:
+        if conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            return None
+        return dict(conn.execute("SELECT filename, hash FROM set_files"))
+    except sqlite3.Error:
+        return None
+    finally:
+        conn.close()
+
+def load_catalog_snapshot(filenames, path=CATALOG_SNAPSHOT, db_name='cards.db'):
+    # The snapshotted catalog when it was taken from exactly these set files (same names and
+    # content) and the database was built from the same ones; None when the snapshot is missing,
+    # from another version or out of date, or the database needs a build
+    try:
+        with open(path, 'rb') as file:
+            snapshot = pickle.load(file)
+        if snapshot['version'] != (SNAPSHOT_VERSION, SCHEMA_VERSION) or set(snapshot['files']) != set(filenames):
+            return None
+        states = set_file_states(filenames, snapshot['files'])
+        if any(states[filename][2] != snapshot['files'][filename][2] for filename in filenames):
+            return None
+        if database_set_hashes(db_name) != {filename: states[filename][2] for filename in filenames}:
+            return None
+        return CardCatalog(Card(*row) for row in snapshot['cards'])
+    except (OSError, EOFError, pickle.UnpicklingError, KeyError, TypeError, ValueError, AttributeError):
+        return None
@@ -0,0 +1,98 @@
+import csv
+import sqlite3
+from collections import Counter
+
+# The collection has its own database next to the card database: cards.db is rebuilt from the
+# set files (and tracked in git), the owned quantities are the user's own data
+COLLECTION_DB = "collection.db"
+
+def create_collection_table(c, schema="main"):
+    c.execute(f'''CREATE TABLE IF NOT EXISTS {schema}.collection
+                  (code TEXT PRIMARY KEY, quantity INTEGER NOT NULL) WITHOUT ROWID''')
+
+def read_collection_csv(filename):
+    # {code: quantity} from "code,quantity" lines; a header row and blank lines are skipped.
+    # Returns (quantities, [(line, error)]).
+    quantities = {}
+    errors = []
+    with open(filename, newline='', encoding='utf-8-sig') as file:
+        for line, row in enumerate(csv.reader(file), 1):
+            if not row or not "".join(row).strip():
+                continue
+            if len(row) < 2:
+                errors.append((line, "expected code,quantity"))
+                continue
+            code, quantity = row[0].strip(), row[1].strip()
+            try:
+                quantity = int(quantity)
+            except ValueError:
+                if line != 1:
+                    errors.append((line, f"quantity '{quantity}' is not a number"))
+                continue
+            if quantity < 0:
+                errors.append((line, f"negative quantity {quantity}"))
+                continue
+            quantities[code] = quantity
+    return quantities, errors
+
+class Collection:
+    # Owned copies per card code, stored in the collection database and mirrored in a dict so the grid
+    # and deck lists check ownership without queries
+    def __init__(self, db_name=COLLECTION_DB):
+        self.conn = sqlite3.connect(db_name)
+        with self.conn:
+            create_collection_table(self.conn.cursor())
+        self.owned = dict(self.conn.execute("SELECT code, quantity FROM collection"))
+
+    def close(self):
+        self.conn.close()
+
+    def __len__(self):
+        # Number of distinct cards owned
+        return len(self.owned)
+
+    def quantity(self, code):
+        return self.owned.get(code, 0)
+
+    def update(self, quantities):
+        # Set the owned quantity of many codes in one transaction, 0 removes a code
+        quantities = {code: int(quantity) for code, quantity in dict(quantities).items()}
+        if any(quantity < 0 for quantity in quantities.values()):
+            raise ValueError("owned quantities can't be negative")
+        with self.conn:
+            self.conn.executemany('''INSERT INTO collection VALUES (?,?)
+                                     ON CONFLICT (code) DO UPDATE SET quantity = excluded.quantity''',
+                                  ((code, quantity) for code, quantity in quantities.items() if quantity))
+            self.conn.executemany("DELETE FROM collection WHERE code = ?",
+                                  ((code,) for code, quantity in quantities.items() if not quantity))
+        for code, quantity in quantities.items():
+            if quantity:
+                self.owned[code] = quantity
+            else:
+                self.owned.pop(code, None)
+
+    def add(self, counts):
+        # Add copies ({code: copies}) to the owned quantities
+        self.update({code: self.quantity(code) + copies for code, copies in counts.items()})
+
+    def deck_codes(self, deck):
+        # {code: copies} over both sections of a deck; cards without a code are left out
+        counts = Counter()
+        for section in (deck.main, deck.evolved):
+            for card_name, count in section.items():
+                card = deck.catalog.get(card_name)
+                if card and card.code:
+                    counts[card.code] += count
+        return counts
+
+    def missing(self, deck):
+        # {card name: copies short} for the cards of a deck that aren't owned often enough
+        needed = Counter(deck.main)
+        needed.update(deck.evolved)
+        missing = {}
+        for card_name, count in needed.items():
+            card = deck.catalog.get(card_name)
+            short = count - (self.owned.get(card.code, 0) if card else 0)
+            if short > 0:
+                missing[card_name] = short
+        return missing
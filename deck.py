@@ -0,0 +1,275 @@
+import base64
+from collections import Counter
+
+from deck_stats import DeckStats
+
+# Copies of a single card allowed in the deck or evolved deck
+MAX_COPIES = 3
+
+# Binary deck files start with this magic and format version; deck codes are the same bytes
+# in URL-safe base64 without padding
+BINARY_MAGIC = b"SVD"
+BINARY_VERSION = 1
+BINARY_EXTENSION = ".svd"
+
+def write_varint(out, value):
+    # Append an unsigned LEB128 varint to a bytearray
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+def read_varint(data, position):
+    # Decode an unsigned LEB128 varint, returns (value, next position)
+    value = 0
+    shift = 0
+    while True:
+        if position >= len(data):
+            raise ValueError("truncated deck data")
+        byte = data[position]
+        position += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, position
+        shift += 7
+
+def write_string(out, text):
+    encoded = text.encode("utf-8")
+    write_varint(out, len(encoded))
+    out += encoded
+
+def read_string(data, position):
+    length, position = read_varint(data, position)
+    if position + length > len(data):
+        raise ValueError("truncated deck data")
+    return bytes(data[position:position + length]).decode("utf-8"), position + length
+
+def split_code(code):
+    # Card codes look like "BP01-042"; the set prefix is shared by many cards of a deck
+    prefix, separator, suffix = code.rpartition("-")
+    return prefix + separator, suffix
+
+class Deck:
+    # Main and evolved deck card counts keyed by card name. Evolved cards are
+    # routed to the evolved deck using the catalog.
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self.main = {}
+        self.evolved = {}
+
+    def section_for(self, card_name):
+        # The deck a card belongs in
+        card = self.catalog.get(card_name)
+        if card and card.evolved == "yes":
+            return self.evolved
+        return self.main
+
+    def add(self, card_name):
+        # Add one copy of a card, returns False when the copy limit is reached
+        section = self.section_for(card_name)
+        count = section.get(card_name, 0)
+        if count >= MAX_COPIES:
+            return False
+        section[card_name] = count + 1
+        return True
+
+    def remove(self, card_name, section=None):
+        # Remove one copy of a card, returns False when it wasn't in the deck
+        if section is None:
+            section = self.section_for(card_name)
+        count = section.get(card_name, 0)
+        if count <= 0:
+            return False
+        if count == 1:
+            del section[card_name]
+        else:
+            section[card_name] = count - 1
+        return True
+
+    def clear(self):
+        # Empty both decks, keeping the same dict objects
+        self.main.clear()
+        self.evolved.clear()
+
+    def replace(self, other):
+        # Take over the contents of another deck in place
+        self.clear()
+        self.main.update(other.main)
+        self.evolved.update(other.evolved)
+
+    def card_names(self):
+        return set(self.main) | set(self.evolved)
+
+    def total(self):
+        return sum(self.main.values())
+
+    def evolved_total(self):
+        return sum(self.evolved.values())
+
+    def sorted_entries(self, section):
+        # (cost, name, count) for every card of a deck section, cheapest first
+        entries = []
+        for card_name, count in section.items():
+            card = self.catalog.get(card_name)
+            entries.append((card.cost if card else 0, card_name, count))
+        entries.sort()
+        return entries
+
+    def type_counts(self):
+        # Number of cards of each type in the main deck
+        counts = Counter()
+        for card_name, count in self.main.items():
+            card = self.catalog.get(card_name)
+            counts[card.type if card else ""] += count
+        return counts
+
+    def validate(self):
+        # List the problems that make the deck unusable as it stands
+        problems = []
+        for section_name, section in (("Deck", self.main), ("Evolved Deck", self.evolved)):
+            for card_name, count in section.items():
+                card = self.catalog.get(card_name)
+                if card is None:
+                    problems.append(f"{section_name}: unknown card '{card_name}'")
+                    continue
+                if count > MAX_COPIES:
+                    problems.append(f"{section_name}: {count} copies of '{card_name}' (max {MAX_COPIES})")
+                if (card.evolved == "yes") != (section is self.evolved):
+                    problems.append(f"{section_name}: '{card_name}' belongs in the "
+                                    f"{'evolved deck' if card.evolved == 'yes' else 'main deck'}")
+        return problems
+
+    def analyze(self):
+        # Summary statistics of the deck
+        analysis = DeckStats(self).as_dict()
+        analysis['evolved_cards'] = self.evolved_total()
+        return analysis
+
+    def to_text(self):
+        # Serialize in the exported text format
+        lines = ["Deck:"]
+        for card_name, count in self.main.items():
+            lines.append(f"x{count} {card_name} ")
+        lines.append("")
+        lines.append("Evolved Deck:")
+        for card_name, count in self.evolved.items():
+            lines.append(f"x{count} {card_name} ")
+        return "\n".join(lines) + "\n"
+
+    @classmethod
+    def from_text(cls, catalog, text):
+        # Parse the exported text format
+        deck = cls(catalog)
+        current_dict = None
+        for n, line in enumerate(text.splitlines(), 1):
+            if line.startswith("Deck:"):
+                current_dict = deck.main
+            elif line.startswith("Evolved Deck:"):
+                current_dict = deck.evolved
+            elif line.startswith("x"):
+                try:
+                    count, card_name = line.split(" ", 1)
+                    card_name = card_name.strip()
+                    count = int(count[1:])
+                    if not card_name:
+                        raise ValueError
+                except ValueError:
+                    raise ValueError(f"line {n}: expected 'x<count> <name>'") from None
+                if current_dict is not None:
+                    current_dict[card_name] = count
+        return deck
+
+    def to_bytes(self):
+        # Serialize in the binary format keyed by card code: magic and version, a table of
+        # code prefixes, then for the main and evolved deck the number of entries followed by
+        # (prefix index, code suffix, count) per entry, all lengths and numbers as varints
+        sections = []
+        prefixes = {}
+        for section in (self.main, self.evolved):
+            entries = []
+            for card_name, count in section.items():
+                card = self.catalog.get(card_name)
+                if card is None or not card.code:
+                    raise ValueError(f"Card '{card_name}' has no card code")
+                prefix, suffix = split_code(card.code)
+                entries.append((prefixes.setdefault(prefix, len(prefixes)), suffix, count))
+            sections.append(entries)
+
+        out = bytearray(BINARY_MAGIC)
+        out.append(BINARY_VERSION)
+        write_varint(out, len(prefixes))
+        for prefix in prefixes:
+            write_string(out, prefix)
+        for entries in sections:
+            write_varint(out, len(entries))
+            for prefix_index, suffix, count in entries:
+                write_varint(out, prefix_index)
+                write_string(out, suffix)
+                write_varint(out, count)
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, catalog, data):
+        # Parse the binary format, entries keep their order
+        data = bytes(data)
+        header = len(BINARY_MAGIC)
+        if data[:header] != BINARY_MAGIC:
+            raise ValueError("not a binary deck")
+        if len(data) <= header or data[header] != BINARY_VERSION:
+            raise ValueError("unsupported binary deck version")
+        position = header + 1
+        prefix_count, position = read_varint(data, position)
+        prefixes = []
+        for _ in range(prefix_count):
+            prefix, position = read_string(data, position)
+            prefixes.append(prefix)
+
+        deck = cls(catalog)
+        by_code = catalog.by_code
+        for section in (deck.main, deck.evolved):
+            entry_count, position = read_varint(data, position)
+            for _ in range(entry_count):
+                prefix_index, position = read_varint(data, position)
+                if prefix_index >= len(prefixes):
+                    raise ValueError("corrupt deck data")
+                suffix, position = read_string(data, position)
+                count, position = read_varint(data, position)
+                code = prefixes[prefix_index] + suffix
+                card = by_code.get(code)
+                if card is None:
+                    raise ValueError(f"unknown card code '{code}'")
+                section[card.name] = count
+        if position != len(data):
+            raise ValueError("trailing data after deck")
+        return deck
+
+    def to_code(self):
+        # Short shareable deck code
+        return base64.urlsafe_b64encode(self.to_bytes()).rstrip(b"=").decode("ascii")
+
+    @classmethod
+    def from_code(cls, catalog, code):
+        code = "".join(code.split())
+        try:
+            data = base64.urlsafe_b64decode(code + "=" * (-len(code) % 4))
+        except ValueError:
+            raise ValueError("invalid deck code") from None
+        return cls.from_bytes(catalog, data)
+
+    def save(self, filename):
+        # Files ending in BINARY_EXTENSION are written in the binary format, anything else as text
+        if filename.lower().endswith(BINARY_EXTENSION):
+            with open(filename, "wb") as file:
+                file.write(self.to_bytes())
+        else:
+            with open(filename, "w") as file:
+                file.write(self.to_text())
+
+    @classmethod
+    def load(cls, catalog, filename):
+        with open(filename, "rb") as file:
+            data = file.read()
+        if data.startswith(BINARY_MAGIC):
+            return cls.from_bytes(catalog, data)
+        with open(filename, "r") as file:
+            return cls.from_text(catalog, file.read())
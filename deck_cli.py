@@ -0,0 +1,268 @@
+import argparse
+import glob
+import json
+import os
+import sys
+
+from card_db import CardCatalog, build_database
+from collection import COLLECTION_DB, Collection, read_collection_csv
+from deck import Deck, BINARY_EXTENSION
+from deck_library import LIBRARY_DB, DeckLibrary, expand_deck_paths
+from simulator import SIM_TRIALS, simulate, deck_entries
+from synergy import SYNERGY_SUGGESTIONS, SynergyIndex
+
+def load_decks(catalog, paths):
+    # Yield (filename, deck, error) for every deck file, without stopping on a broken one
+    for filename in expand_deck_paths(paths):
+        try:
+            yield filename, Deck.load(catalog, filename), None
+        except (OSError, ValueError) as e:
+            yield filename, None, str(e)
+
+def command_build(args, catalog):
+    errors = []
+    imported = build_database(sorted(glob.glob(os.path.join(args.sets, "*.json"))), args.db,
+                              rebuild=args.rebuild, errors=errors)
+    for error in errors:
+        print(json.dumps(error._asdict()))
+    print(json.dumps({'imported': imported, 'rejected': len(errors)}))
+    return 1 if errors else 0
+
+def command_validate(args, catalog):
+    invalid = 0
+    for filename, deck, error in load_decks(catalog, args.decks):
+        problems = [error] if error else deck.validate()
+        invalid += bool(problems)
+        print(json.dumps({'file': filename, 'valid': not problems, 'problems': problems}))
+    return 1 if invalid else 0
+
+def command_analyze(args, catalog):
+    for filename, deck, error in load_decks(catalog, args.decks):
+        if error:
+            print(json.dumps({'file': filename, 'error': error}))
+        else:
+            print(json.dumps(dict(deck.analyze(), file=filename)))
+    return 0
+
+def command_simulate(args, catalog):
+    for filename, deck, error in load_decks(catalog, args.decks):
+        if error:
+            print(json.dumps({'file': filename, 'error': error}))
+            continue
+        result = simulate(deck_entries(deck), args.trials, args.seed, args.going_second, args.workers)
+        print(json.dumps(dict(result or {}, file=filename)))
+    return 0
+
+def command_code(args, catalog):
+    # Print the deck code of deck files, or decode codes given with --decode into text decks
+    failed = 0
+    if args.decode:
+        for code in args.decks:
+            try:
+                print(Deck.from_code(catalog, code).to_text())
+            except ValueError as e:
+                failed += 1
+                print(json.dumps({'code': code, 'error': str(e)}))
+        return 1 if failed else 0
+    for filename, deck, error in load_decks(catalog, args.decks):
+        if not error:
+            try:
+                print(json.dumps({'file': filename, 'code': deck.to_code()}))
+                continue
+            except ValueError as e:
+                error = str(e)
+        failed += 1
+        print(json.dumps({'file': filename, 'error': error}))
+    return 1 if failed else 0
+
+def command_library(args, catalog):
+    library = DeckLibrary(catalog, args.library,
+                          collection_db=args.collection if args.action in ("buildable", "short") else None)
+    try:
+        if args.action == "import":
+            imported, errors = library.import_files(list(expand_deck_paths(args.decks)))
+            for filename, error in errors:
+                print(json.dumps({'file': filename, 'error': error}))
+            print(json.dumps({'imported': imported, 'failed': len(errors), 'decks': len(library)}))
+            return 1 if errors else 0
+        if args.action == "suggest":
+            # Cards played alongside each deck file, learned from the decks in the library
+            synergy = SynergyIndex()
+            synergy.sync(library)
+            for filename, deck, error in load_decks(catalog, args.decks):
+                if error:
+                    print(json.dumps({'file': filename, 'error': error}))
+                    continue
+                suggestions = synergy.suggest({**deck.main, **deck.evolved}, args.limit or SYNERGY_SUGGESTIONS,
+                                              lambda card_name: card_name in catalog)
+                print(json.dumps({'file': filename, 'decks': len(synergy),
+                                  'suggestions': [{'card': card_name, 'score': round(score, 4)}
+                                                  for card_name, score in suggestions]}))
+            return 0
+        if args.action == "short":
+            for card_name, missing in library.shortfall(args.deck_ids or None):
+                card = catalog.get(card_name)
+                print(json.dumps({'card': card_name, 'code': card.code if card else None, 'missing': missing}))
+            return 0
+        if args.action == "uses":
+            rows = library.decks_using(args.card, args.limit)
+            fields = ('id', 'name', 'class', 'copies')
+        elif args.action == "class":
+            rows = library.decks(args.card_class, args.limit)
+            fields = ('id', 'name', 'class', 'cards')
+        elif args.action == "buildable":
+            rows = library.buildable(None if args.max_missing < 0 else args.max_missing, args.limit)
+            fields = ('id', 'name', 'class', 'cards', 'missing')
+        else:
+            rows = library.most_played(args.limit or 20)
+            fields = ('card', 'decks', 'copies')
+        for row in rows:
+            print(json.dumps(dict(zip(fields, row))))
+        return 0
+    finally:
+        library.close()
+
+def command_collection(args, catalog):
+    collection = Collection(args.collection)
+    try:
+        if args.action == "import":
+            quantities, errors = read_collection_csv(args.file)
+            for line, error in errors:
+                print(json.dumps({'file': args.file, 'line': line, 'error': error}))
+            collection.update(quantities)
+            unknown = sum(code not in catalog.by_code for code in quantities)
+            print(json.dumps({'imported': len(quantities), 'unknown_codes': unknown, 'rejected': len(errors),
+                              'owned': len(collection)}))
+            return 1 if errors else 0
+        if args.action == "add":
+            # Add the copies played in deck files, e.g. for a pre-constructed deck
+            failed = 0
+            for filename, deck, error in load_decks(catalog, args.decks):
+                if error:
+                    failed += 1
+                    print(json.dumps({'file': filename, 'error': error}))
+                    continue
+                counts = collection.deck_codes(deck)
+                collection.add(counts)
+                print(json.dumps({'file': filename, 'added': sum(counts.values())}))
+            return 1 if failed else 0
+        if args.action == "set":
+            try:
+                collection.update({args.code: args.quantity})
+            except ValueError as e:
+                print(json.dumps({'code': args.code, 'error': str(e)}))
+                return 1
+            return 0
+        for code, quantity in sorted(collection.owned.items()):
+            card = catalog.get_by_code(code)
+            print(json.dumps({'code': code, 'card': card.name if card else None, 'quantity': quantity}))
+        return 0
+    finally:
+        collection.close()
+
+def command_convert(args, catalog):
+    os.makedirs(args.output_dir, exist_ok=True)
+    failed = 0
+    for filename, deck, error in load_decks(catalog, args.decks):
+        if error:
+            failed += 1
+            print(json.dumps({'file': filename, 'error': error}))
+            continue
+        # Re-route every card to the deck section it belongs in
+        converted = Deck(catalog)
+        for section in (deck.main, deck.evolved):
+            for card_name, count in section.items():
+                converted.section_for(card_name)[card_name] = count
+        extension = BINARY_EXTENSION if args.format == "binary" else ".txt"
+        output = os.path.join(args.output_dir, os.path.splitext(os.path.basename(filename))[0] + extension)
+        try:
+            converted.save(output)
+        except ValueError as e:
+            failed += 1
+            print(json.dumps({'file': filename, 'error': str(e)}))
+            continue
+        print(json.dumps({'file': filename, 'output': output}))
+    return 1 if failed else 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless Shadowverse Evolve deck tools")
+    parser.add_argument("--db", default="cards.db", help="card database (default: cards.db)")
+    parser.add_argument("--collection", default=COLLECTION_DB,
+                        help=f"owned card quantities (default: {COLLECTION_DB})")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build", help="bring the card database up to date")
+    build_parser.add_argument("--sets", default="sets_db", help="directory of set JSON files")
+    build_parser.add_argument("--rebuild", action="store_true", help="drop and re-import every set file")
+    build_parser.set_defaults(handler=command_build)
+
+    validate_parser = subparsers.add_parser("validate", help="check deck files against the card pool")
+    validate_parser.add_argument("decks", nargs="+", help="deck files or directories of them")
+    validate_parser.set_defaults(handler=command_validate)
+
+    analyze_parser = subparsers.add_parser("analyze", help="print statistics for deck files")
+    analyze_parser.add_argument("decks", nargs="+", help="deck files or directories of them")
+    analyze_parser.set_defaults(handler=command_analyze)
+
+    simulate_parser = subparsers.add_parser("simulate", help="Monte Carlo opening hands of deck files")
+    simulate_parser.add_argument("decks", nargs="+", help="deck files or directories of them")
+    simulate_parser.add_argument("--trials", type=int, default=SIM_TRIALS, help="simulated games per deck")
+    simulate_parser.add_argument("--seed", type=int, default=0, help="random seed")
+    simulate_parser.add_argument("--going-second", action="store_true", help="draw on the first turn")
+    simulate_parser.add_argument("--workers", type=int, help="worker processes (default: one per CPU)")
+    simulate_parser.set_defaults(handler=command_simulate)
+
+    code_parser = subparsers.add_parser("code", help="print shareable deck codes of deck files")
+    code_parser.add_argument("decks", nargs="+", help="deck files or directories of them (deck codes with --decode)")
+    code_parser.add_argument("--decode", action="store_true", help="print deck codes as text decks")
+    code_parser.set_defaults(handler=command_code)
+
+    library_parser = subparsers.add_parser("library", help="store and search decks in the deck library")
+    library_parser.add_argument("--library", default=LIBRARY_DB, help=f"deck library database (default: {LIBRARY_DB})")
+    library_parser.set_defaults(handler=command_library)
+    # --limit belongs to the searching actions, so it goes after the action name
+    limit_parser = argparse.ArgumentParser(add_help=False)
+    limit_parser.add_argument("--limit", type=int, help="maximum number of results")
+    library_actions = library_parser.add_subparsers(dest="action", required=True)
+    library_import = library_actions.add_parser("import", help="add deck files or folders of them")
+    library_import.add_argument("decks", nargs="+", help="deck files or directories of them")
+    library_uses = library_actions.add_parser("uses", parents=[limit_parser], help="decks playing a card")
+    library_uses.add_argument("card", help="card name")
+    library_class = library_actions.add_parser("class", parents=[limit_parser], help="decks of a class")
+    library_class.add_argument("card_class", help="class name, e.g. Forestcraft")
+    library_actions.add_parser("top", parents=[limit_parser], help="most played cards")
+    library_suggest = library_actions.add_parser("suggest", parents=[limit_parser],
+                                              help="cards often played with the cards of deck files")
+    library_suggest.add_argument("decks", nargs="+", help="deck files or directories of them")
+    library_buildable = library_actions.add_parser("buildable", parents=[limit_parser],
+                                                   help="decks the collection can build, fewest missing first")
+    library_buildable.add_argument("--max-missing", type=int, default=0,
+                                   help="also list decks short of up to this many copies (-1: every deck)")
+    library_short = library_actions.add_parser("short", help="cards to get to build library decks")
+    library_short.add_argument("deck_ids", nargs="*", type=int, help="library deck ids (default: every deck)")
+
+    collection_parser = subparsers.add_parser("collection", help="record the owned copies of each card")
+    collection_parser.set_defaults(handler=command_collection)
+    collection_actions = collection_parser.add_subparsers(dest="action", required=True)
+    collection_import = collection_actions.add_parser("import", help="set quantities from a code,quantity CSV file")
+    collection_import.add_argument("file", help="CSV file")
+    collection_add = collection_actions.add_parser("add", help="add the copies played in deck files")
+    collection_add.add_argument("decks", nargs="+", help="deck files or directories of them")
+    collection_set = collection_actions.add_parser("set", help="set the owned quantity of one card")
+    collection_set.add_argument("code", help="card code, e.g. BP01-001")
+    collection_set.add_argument("quantity", type=int, help="copies owned (0 removes the card)")
+    collection_actions.add_parser("list", help="print the owned cards")
+
+    convert_parser = subparsers.add_parser("convert", help="rewrite deck files in the export format")
+    convert_parser.add_argument("decks", nargs="+", help="deck files or directories of them")
+    convert_parser.add_argument("-o", "--output-dir", required=True, help="directory for the converted decks")
+    convert_parser.add_argument("--format", choices=("text", "binary"), default="text",
+                                help=f"text export format or binary {BINARY_EXTENSION} files")
+    convert_parser.set_defaults(handler=command_convert)
+
+    args = parser.parse_args(argv)
+    catalog = None if args.command == "build" else CardCatalog.load(args.db)
+    return args.handler(args, catalog)
+
+if __name__ == "__main__":
+    sys.exit(main())
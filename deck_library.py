@@ -0,0 +1,249 @@
+import glob
+import json
+import os
+import sqlite3
+import time
+from collections import Counter, defaultdict
+
+from collection import create_collection_table
+from deck import Deck, BINARY_EXTENSION
+
+# Kept apart from cards.db, which is dropped and re-imported whenever its schema changes
+LIBRARY_DB = "decks.db"
+# Bump when the layout of the library tables changes; older libraries are migrated by re-creating them
+LIBRARY_SCHEMA_VERSION = 1
+# Deck sections as stored in deck_cards.section
+MAIN_SECTION = 0
+EVOLVED_SECTION = 1
+# Deck ids bound into one IN (...) query
+QUERY_BATCH = 500
+
+def expand_deck_paths(paths):
+    # Expand directories into the deck files they contain
+    for path in paths:
+        if os.path.isdir(path):
+            yield from sorted(glob.glob(os.path.join(path, "**", "*.txt"), recursive=True) +
+                              glob.glob(os.path.join(path, "**", f"*{BINARY_EXTENSION}"), recursive=True))
+        else:
+            yield path
+
+def deck_class(deck):
+    # The class a deck is filed under: its most played non-neutral class
+    classes = Counter()
+    for card_name, count in deck.main.items():
+        card = deck.catalog.get(card_name)
+        if card and card.card_class != "Neutral":
+            classes[card.card_class] += count
+    return classes.most_common(1)[0][0] if classes else "Neutral"
+
+def create_library_tables(c):
+    # Decks keep their text export so unknown cards survive a round trip; deck_cards holds one
+    # row per card and section for the lookups, card_usage the running totals for "most played"
+    c.execute('''CREATE TABLE IF NOT EXISTS decks
+                 (id INTEGER PRIMARY KEY, name TEXT, source TEXT UNIQUE, class TEXT,
+                 cards INTEGER, evolved_cards INTEGER, imported REAL, content TEXT)''')
+    c.execute('''CREATE TABLE IF NOT EXISTS deck_cards
+                 (deck_id INTEGER, section INTEGER, card_name TEXT, code TEXT, count INTEGER,
+                 PRIMARY KEY (deck_id, section, card_name)) WITHOUT ROWID''')
+    c.execute('''CREATE TABLE IF NOT EXISTS card_usage
+                 (card_name TEXT PRIMARY KEY, decks INTEGER, copies INTEGER) WITHOUT ROWID''')
+    c.execute('''CREATE INDEX IF NOT EXISTS idx_deck_cards_card ON deck_cards (card_name, deck_id)''')
+    c.execute('''CREATE INDEX IF NOT EXISTS idx_decks_class ON decks (class, name)''')
+    c.execute('''CREATE INDEX IF NOT EXISTS idx_card_usage_decks ON card_usage (decks DESC, copies DESC)''')
+    c.execute(f"PRAGMA user_version = {LIBRARY_SCHEMA_VERSION}")
+
+# Copies each stored deck is short of, per card: the deck's copies of a card over both sections
+# minus the owned quantity of its code in the attached collection. Cards without a code can't be
+# owned and always count as missing.
+SHORTFALL_SQL = '''SELECT needs.deck_id, needs.card_name, needs.copies,
+                          MAX(needs.copies - COALESCE(owned.quantity, 0), 0) AS missing
+                   FROM (SELECT deck_id, card_name, MAX(code) AS code, SUM(count) AS copies
+                         FROM deck_cards GROUP BY deck_id, card_name) AS needs
+                   LEFT JOIN owned.collection AS owned ON owned.code = needs.code'''
+
+class DeckLibrary:
+    # Saved decks in SQLite with per-deck card rows, so "decks using card X", "decks of class Y"
+    # and "most played cards" are index lookups however many decks are stored. With collection_db
+    # (the collection database) attached, buildable/shortfall compare every deck with the collection.
+    def __init__(self, catalog, db_name=LIBRARY_DB, collection_db=None):
+        self.catalog = catalog
+        self.conn = sqlite3.connect(db_name)
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        with self.conn:
+            if version not in (0, LIBRARY_SCHEMA_VERSION):
+                for table in ("decks", "deck_cards", "card_usage"):
+                    self.conn.execute(f"DROP TABLE IF EXISTS {table}")
+            create_library_tables(self.conn.cursor())
+        self.has_collection = bool(collection_db)
+        if collection_db:
+            self.conn.execute("ATTACH DATABASE ? AS owned", (collection_db,))
+            with self.conn:
+                create_collection_table(self.conn.cursor(), "owned")
+
+    def close(self):
+        self.conn.close()
+
+    def _delete(self, c, deck_id):
+        # Remove a deck and take its cards out of the usage totals
+        c.execute('''UPDATE card_usage SET decks = decks - 1,
+                     copies = copies - (SELECT SUM(count) FROM deck_cards
+                                        WHERE deck_id = ? AND card_name = card_usage.card_name)
+                     WHERE card_name IN (SELECT card_name FROM deck_cards WHERE deck_id = ?)''', (deck_id, deck_id))
+        c.execute("DELETE FROM card_usage WHERE decks <= 0")
+        c.execute("DELETE FROM deck_cards WHERE deck_id = ?", (deck_id,))
+        c.execute("DELETE FROM decks WHERE id = ?", (deck_id,))
+
+    def _insert(self, c, deck, name, source, usage):
+        # Store one deck, replacing the deck previously imported from the same source. Its cards
+        # are added to `usage`, which the caller flushes into card_usage with _add_usage.
+        if source is not None:
+            row = c.execute("SELECT id FROM decks WHERE source = ?", (source,)).fetchone()
+            if row:
+                self._delete(c, row[0])
+        c.execute('''INSERT INTO decks (name, source, class, cards, evolved_cards, imported, content)
+                     VALUES (?,?,?,?,?,?,?)''',
+                  (name, source, deck_class(deck), deck.total(), deck.evolved_total(), time.time(), deck.to_text()))
+        deck_id = c.lastrowid
+        rows = []
+        for section_id, section in ((MAIN_SECTION, deck.main), (EVOLVED_SECTION, deck.evolved)):
+            for card_name, count in section.items():
+                card = self.catalog.get(card_name)
+                rows.append((deck_id, section_id, card_name, card.code if card else None, count))
+        c.executemany("INSERT INTO deck_cards VALUES (?,?,?,?,?)", rows)
+        for card_name, count in deck.main.items():
+            usage[card_name][0] += 1
+            usage[card_name][1] += count
+        for card_name, count in deck.evolved.items():
+            if card_name not in deck.main:
+                usage[card_name][0] += 1
+            usage[card_name][1] += count
+        return deck_id
+
+    def _add_usage(self, c, usage):
+        c.executemany('''INSERT INTO card_usage VALUES (?,?,?)
+                         ON CONFLICT (card_name) DO UPDATE SET decks = decks + excluded.decks,
+                         copies = copies + excluded.copies''',
+                      ((card_name, decks, copies) for card_name, (decks, copies) in usage.items()))
+
+    def add(self, deck, name, source=None):
+        # Save a deck, returns its id
+        usage = defaultdict(lambda: [0, 0])
+        with self.conn:
+            c = self.conn.cursor()
+            deck_id = self._insert(c, deck, name, source, usage)
+            self._add_usage(c, usage)
+        return deck_id
+
+    def remove(self, deck_id):
+        with self.conn:
+            self._delete(self.conn.cursor(), deck_id)
+
+    def import_files(self, filenames):
+        # Bulk import deck files in a single transaction, each file replacing its earlier import.
+        # Usage totals of the batch are summed in memory and written once at the end, which is
+        # only correct when no file is replaced within the batch, hence the dedupe.
+        # Returns (imported count, [(filename, error)]).
+        imported = 0
+        errors = []
+        usage = defaultdict(lambda: [0, 0])
+        with self.conn:
+            c = self.conn.cursor()
+            for filename in dict.fromkeys(os.path.abspath(filename) for filename in filenames):
+                try:
+                    deck = Deck.load(self.catalog, filename)
+                except (OSError, ValueError) as e:
+                    errors.append((filename, str(e)))
+                    continue
+                name = os.path.splitext(os.path.basename(filename))[0]
+                self._insert(c, deck, name, filename, usage)
+                imported += 1
+            self._add_usage(c, usage)
+        return imported, errors
+
+    def get(self, deck_id):
+        # Load a stored deck, None when the id is unknown
+        row = self.conn.execute("SELECT content FROM decks WHERE id = ?", (deck_id,)).fetchone()
+        return Deck.from_text(self.catalog, row[0]) if row else None
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM decks").fetchone()[0]
+
+    def decks(self, card_class=None, limit=None):
+        # (id, name, class, cards) of the stored decks, optionally of one class, by name
+        sql = "SELECT id, name, class, cards FROM decks"
+        parameters = []
+        if card_class:
+            sql += " WHERE class = ?"
+            parameters.append(card_class)
+        sql += " ORDER BY name"
+        if limit:
+            sql += " LIMIT ?"
+            parameters.append(limit)
+        return self.conn.execute(sql, parameters).fetchall()
+
+    def decks_using(self, card_name, limit=None):
+        # (id, name, class, copies) of the decks playing a card
+        sql = '''SELECT decks.id, decks.name, decks.class, SUM(deck_cards.count) FROM deck_cards
+                 JOIN decks ON decks.id = deck_cards.deck_id
+                 WHERE deck_cards.card_name = ? GROUP BY decks.id ORDER BY decks.name'''
+        parameters = [card_name]
+        if limit:
+            sql += " LIMIT ?"
+            parameters.append(limit)
+        return self.conn.execute(sql, parameters).fetchall()
+
+    def most_played(self, limit=20):
+        # (card name, decks playing it, total copies), most widely played first
+        return self.conn.execute('''SELECT card_name, decks, copies FROM card_usage
+                                    ORDER BY decks DESC, copies DESC LIMIT ?''', (limit,)).fetchall()
+
+    def deck_keys(self):
+        # (id, import time) of every stored deck; SQLite may hand the id of a removed deck to a
+        # new one, the import time tells them apart
+        return self.conn.execute("SELECT id, imported FROM decks").fetchall()
+
+    def deck_card_names(self, deck_ids):
+        # (deck id, card name) for every card of the given decks, both sections, grouped by deck
+        deck_ids = sorted(deck_ids)
+        for start in range(0, len(deck_ids), QUERY_BATCH):
+            batch = deck_ids[start:start + QUERY_BATCH]
+            yield from self.conn.execute(f"""SELECT deck_id, card_name FROM deck_cards
+                                             WHERE deck_id IN ({",".join("?" * len(batch))})
+                                             ORDER BY deck_id""", batch)
+
+    def buildable(self, max_missing=0, limit=None):
+        # (id, name, class, cards, copies missing) of the decks short of at most max_missing
+        # copies (None for every deck), fewest missing first; one grouped join over all decks
+        if not self.has_collection:
+            raise ValueError("no collection attached to the deck library")
+        sql = f"""SELECT decks.id, decks.name, decks.class, decks.cards + decks.evolved_cards,
+                         COALESCE(SUM(shortfall.missing), 0) AS total_missing
+                  FROM decks LEFT JOIN ({SHORTFALL_SQL}) AS shortfall ON shortfall.deck_id = decks.id
+                  GROUP BY decks.id"""
+        parameters = []
+        if max_missing is not None:
+            sql += " HAVING total_missing <= ?"
+            parameters.append(max_missing)
+        sql += " ORDER BY total_missing, decks.name"
+        if limit:
+            sql += " LIMIT ?"
+            parameters.append(limit)
+        return self.conn.execute(sql, parameters).fetchall()
+
+    def shortfall(self, deck_ids=None):
+        # (card name, copies missing) to get so each of the given decks (all decks when None) can
+        # be built, most missing first. Decks are built one at a time, so a card short in several
+        # decks needs the largest of their shortfalls, not the sum.
+        if not self.has_collection:
+            raise ValueError("no collection attached to the deck library")
+        sql = f"SELECT card_name, MAX(missing) AS needed FROM ({SHORTFALL_SQL}) WHERE missing > 0"
+        parameters = []
+        if deck_ids is not None:
+            deck_ids = list(deck_ids)
+            if not deck_ids:
+                return []
+            # One JSON parameter rather than a placeholder per deck, which could exceed SQLite's limit
+            sql += " AND deck_id IN (SELECT value FROM json_each(?))"
+            parameters.append(json.dumps(deck_ids))
+        sql += " GROUP BY card_name ORDER BY needed DESC, card_name"
+        return self.conn.execute(sql, parameters).fetchall()
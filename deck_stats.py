@@ -0,0 +1,87 @@
+import math
+from collections import Counter
+
+# Cards in the opening hand; the player going first skips the draw of their first turn
+OPENING_HAND = 4
+# Turns covered by the draw odds
+STATS_TURNS = 6
+
+def cards_seen(turn, going_second=False):
+    # Number of cards drawn by the given turn (mulligans not counted)
+    return OPENING_HAND + turn - (0 if going_second else 1)
+
+class HypergeometricTable:
+    # Binomial coefficients for decks up to max_size, computed once as Pascal's triangle
+    def __init__(self, max_size=60):
+        self.max_size = max_size
+        self.rows = [[1]]
+        for n in range(1, max_size + 1):
+            previous = self.rows[-1]
+            self.rows.append([1] + [previous[k - 1] + previous[k] for k in range(1, n)] + [1])
+
+    def comb(self, n, k):
+        if k < 0 or k > n:
+            return 0
+        if n <= self.max_size:
+            return self.rows[n][k]
+        return math.comb(n, k)
+
+    def at_least(self, deck_size, copies, draws, wanted=1):
+        # Probability of drawing at least `wanted` of `copies` cards in `draws` cards from the deck.
+        # An empty deck draws nothing, and a deck can't hold more copies than cards.
+        if deck_size <= 0:
+            return 0.0
+        copies = min(copies, deck_size)
+        draws = min(draws, deck_size)
+        total = self.comb(deck_size, draws)
+        if total == 0:
+            return 0.0
+        misses = sum(self.comb(copies, hit) * self.comb(deck_size - copies, draws - hit) for hit in range(wanted))
+        return 1 - misses / total
+
+# Shared table, decks are well below 60 cards
+HYPERGEOMETRIC = HypergeometricTable()
+
+class DeckStats:
+    # Mana curve, type/class/trait mix and draw odds of a deck, computed in one pass over its entries
+    def __init__(self, deck, going_second=False):
+        self.going_second = going_second
+        self.cost_curve = Counter()
+        self.types = Counter()
+        self.classes = Counter()
+        self.traits = Counter()
+        self.copies = {}
+        total_cost = 0
+        for card_name, count in deck.main.items():
+            card = deck.catalog.get(card_name)
+            self.copies[card_name] = count
+            if card is None:
+                continue
+            self.cost_curve[card.cost] += count
+            self.types[card.type] += count
+            self.classes[card.card_class] += count
+            total_cost += card.cost * count
+            for trait in (card.trait or "").split(" / "):
+                if trait:
+                    self.traits[trait] += count
+        self.size = sum(self.copies.values())
+        self.average_cost = total_cost / self.size if self.size else 0.0
+
+    def draw_odds(self, copies, turns=STATS_TURNS):
+        # Chance of having drawn at least one of `copies` cards by each of turns 1..turns
+        return [HYPERGEOMETRIC.at_least(self.size, copies, cards_seen(turn, self.going_second))
+                for turn in range(1, turns + 1)]
+
+    def card_odds(self, card_name, turns=STATS_TURNS):
+        return self.draw_odds(self.copies.get(card_name, 0), turns)
+
+    def as_dict(self):
+        return {
+            'cards': self.size,
+            'average_cost': round(self.average_cost, 2),
+            'cost_curve': {cost: self.cost_curve[cost] for cost in sorted(self.cost_curve)},
+            'types': dict(self.types),
+            'classes': dict(self.classes),
+            'traits': dict(self.traits.most_common()),
+            'draw_odds': {copies: [round(p, 4) for p in self.draw_odds(copies)] for copies in (1, 2, 3)},
+        }
@@ -1,67 +1,463 @@
 import tkinter as tk
-from tkinter import ttk, messagebox, filedialog
+from tkinter import ttk, messagebox, filedialog, simpledialog
 import sqlite3
-from PIL import Image, ImageTk
 import json
 import glob
+import os
+import argparse
 import threading
 import queue
+from collections import namedtuple, OrderedDict
+import math
+import itertools
+import mmap
+import time
+import re
+
+from collection import COLLECTION_DB, Collection
+from card_db import (ATLAS_DIR, CardCatalog, CardQuery, FacetIndex, FuzzyIndex, build_database,
+                     build_thumbnail_atlases, connect_read_only, load_catalog_snapshot, save_catalog_snapshot)
+from deck import Deck, BINARY_EXTENSION
+from deck_library import DeckLibrary, expand_deck_paths
+from deck_stats import DeckStats, STATS_TURNS
+from simulator import simulate, deck_entries, CURVE_TURNS
+from profiler import Profiler
+from synergy import SynergyIndex
+
+# Delay before a burst of keystrokes in the name/trait filters is evaluated
+FILTER_DEBOUNCE_MS = 150
+
+# Card grid layout. Cells are fixed-size so only the rows in view need widgets;
+# the default cell size is replaced by the real one once the first thumbnail loads.
+CARD_COLUMNS = 9
+CARD_PADDING = 5
+DEFAULT_CELL_SIZE = (130, 180)
+# Device scale (Tk scaling relative to 96 dpi) from which the grid shows the double-size thumbnails
+HIDPI_SCALE = 1.5
+
+# Memory budgets for decoded images (estimated as 4 bytes per pixel)
+THUMBNAIL_CACHE_BYTES = 64 * 1024 * 1024
+FULL_IMAGE_CACHE_BYTES = 32 * 1024 * 1024
+
+# Threads decoding thumbnails in parallel (PIL releases the GIL while decoding)
+IMAGE_DECODE_WORKERS = min(4, os.cpu_count() or 1)
+
+# Threads with their own read-only database connection serving filter queries
+QUERY_WORKERS = 2
+# Interval at which the Tk thread picks up results posted by worker threads
+DISPATCH_POLL_MS = 10
+
+# Refresh interval of the debug overlay
+DEBUG_OVERLAY_MS = 500
+
+# Grid border and deck list colours of cards in the deck, and of those short of owned copies
+DECK_HIGHLIGHT = "yellow"
+MISSING_HIGHLIGHT = "red"
+
+# Match count appended to combobox values, e.g. "Forestcraft (137)"
+FACET_COUNT_SUFFIX = re.compile(r" \(\d+\)$")
+
+FilterState = namedtuple('FilterState', 'selected_class name_filter type_filter universe_filter rarity_filter '
+                                        'evolved_filter cost_filter trait_filter show_only_in_deck sort_option '
+                                        'card_set_filter fuzzy_search')
+
+class ImageCache:
+    # LRU cache of decoded images bounded by an estimated memory budget
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def image_bytes(image):
+        return image.width() * image.height() * 4
+
+    def get(self, key):
+        # Return the cached image and mark it as recently used, or None on a miss
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, image):
+        # Store an image, evicting the least recently used ones until the budget fits
+        size = self.image_bytes(image)
+        with self.lock:
+            if key in self.entries:
+                self.total_bytes -= self.entries.pop(key)[1]
+            self.entries[key] = (image, size)
+            self.total_bytes += size
+            while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+                _, (_, evicted_size) = self.entries.popitem(last=False)
+                self.total_bytes -= evicted_size
+                self.evictions += 1
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def stats(self):
+        return {'entries': len(self.entries), 'bytes': self.total_bytes, 'hits': self.hits,
+                'misses': self.misses, 'evictions': self.evictions}
+
+class ThumbnailAtlas:
+    # Read-only view over the packed per-set thumbnail blobs; images are sliced straight out of the mmap.
+    # With atlas_dir None the atlas is empty (used until the atlases are known to be up to date).
+    def __init__(self, atlas_dir=ATLAS_DIR, suffix='mini'):
+        self.entries = {}
+        self.maps = []
+        if atlas_dir is None:
+            return
+        for index_file in sorted(glob.glob(os.path.join(atlas_dir, f"*_{suffix}.json"))):
+            blob_file = index_file[:-len(".json")] + ".rgba"
+            try:
+                with open(index_file, 'r') as file:
+                    index = json.load(file)
+                if not index['cards']:
+                    continue
+                with open(blob_file, 'rb') as file:
+                    atlas_map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Skipping thumbnail atlas {index_file}: {e}")
+                continue
+            self.maps.append(atlas_map)
+            for code, (offset, width, height) in index['cards'].items():
+                self.entries[code] = (atlas_map, offset, width, height)
+
+    def get(self, code):
+        # Return the thumbnail as a PIL image backed by the mapped file, or None if it isn't packed
+        # (or the atlas was closed by the Tk thread while a decode thread was reading it)
+        entry = self.entries.get(code)
+        if entry is None:
+            return None
+        from PIL import Image
+        atlas_map, offset, width, height = entry
+        try:
+            data = memoryview(atlas_map)[offset:offset + width * height * 4]
+        except ValueError:
+            return None
+        return Image.frombuffer('RGBA', (width, height), data, 'raw', 'RGBA', 0, 1)
+
+    def close(self):
+        # Unmap the blobs. A map still backing an image that hasn't been converted yet can't be
+        # closed now; it is released with the last of those images.
+        self.entries = {}
+        for atlas_map in self.maps:
+            try:
+                atlas_map.close()
+            except BufferError:
+                pass
+        self.maps = []
+
+    def __len__(self):
+        return len(self.entries)
+
+class TkDispatcher:
+    # Hands results from worker threads to the Tk thread. Workers only put callbacks on a queue;
+    # the Tk thread drains it on a recurring after() poll, so no thread but Tk's touches Tk.
+    def __init__(self, root, poll_ms=DISPATCH_POLL_MS):
+        self.root = root
+        self.poll_ms = poll_ms
+        self.calls = queue.Queue()
+        self.root.after(self.poll_ms, self.poll)
+
+    def post(self, callback, *args):
+        # Any thread: run callback(*args) on the Tk thread
+        self.calls.put((callback, args))
+
+    def pending(self):
+        return self.calls.qsize()
+
+    def poll(self):
+        try:
+            while True:
+                try:
+                    callback, args = self.calls.get_nowait()
+                except queue.Empty:
+                    break
+                callback(*args)
+        finally:
+            self.root.after(self.poll_ms, self.poll)
+
+class ImageLoader:
+    # Pool of decode threads fed by a priority queue. Requests for a key that is already
+    # queued with the same or better priority, or already being decoded, are dropped.
+    def __init__(self, decode, deliver, workers=IMAGE_DECODE_WORKERS, profiler=None):
+        self.decode = decode
+        self.deliver = deliver
+        self.profiler = profiler or Profiler()
+        self.queue = queue.PriorityQueue()
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.in_flight = set()
+        self.sequence = itertools.count()
+        self.threads = []
+        for _ in range(workers):
+            thread = threading.Thread(target=self.run)
+            thread.daemon = True
+            thread.start()
+            self.threads.append(thread)
+
+    def request(self, key, priority):
+        # Queue a decode; lower priorities are served first and re-requesting with a better one promotes it
+        with self.lock:
+            if key in self.in_flight:
+                return False
+            current = self.pending.get(key)
+            if current is not None and current <= priority:
+                return False
+            self.pending[key] = priority
+        self.queue.put((priority, next(self.sequence), key))
+        return True
+
+    def complete(self, key):
+        # Called once the decoded result has been consumed, allowing the key to be requested again
+        with self.lock:
+            self.in_flight.discard(key)
+
+    def depth(self):
+        return len(self.pending)
+
+    def run(self):
+        while True:
+            priority, _, key = self.queue.get()
+            with self.lock:
+                # Skip entries superseded by a re-request with a better priority
+                if self.pending.get(key) != priority:
+                    continue
+                del self.pending[key]
+                self.in_flight.add(key)
+            start = time.perf_counter()
+            try:
+                result = self.decode(key)
+            except Exception as e:
+                # Keep the worker alive; the key is delivered as missing
+                print(f"Error decoding image {key}: {e}")
+                result = None
+            self.profiler.latency("decode", (time.perf_counter() - start) * 1000)
+            self.deliver(key, result)
+
+class QueryWorker:
+    # Small pool of threads, each owning a read-only connection and a CardQuery over it. Jobs run
+    # off the Tk thread and their results are handed back through the dispatcher.
+    def __init__(self, dispatcher, db_name='cards.db', workers=QUERY_WORKERS, profiler=None):
+        self.dispatcher = dispatcher
+        self.db_name = db_name
+        self.profiler = profiler or Profiler()
+        self.jobs = queue.Queue()
+        self.threads = []
+        for _ in range(workers):
+            thread = threading.Thread(target=self.run)
+            thread.daemon = True
+            thread.start()
+            self.threads.append(thread)
+
+    def submit(self, work, callback, *args):
+        # Run work(card_query) on a worker and then callback(*args, result) on the Tk thread
+        self.jobs.put((work, callback, args))
+
+    def join(self):
+        # Wait until every submitted job has run (their callbacks may still be pending in Tk)
+        self.jobs.join()
+
+    def busy(self):
+        # Tk thread: True while a job is running or a result waits to be dispatched. Results are
+        # posted before their job is marked done, so a finished job is never missed in between.
+        return self.jobs.unfinished_tasks > 0 or self.dispatcher.pending() > 0
+
+    def run(self):
+        conn = connect_read_only(self.db_name)
+        if self.profiler.enabled:
+            conn.set_trace_callback(self.profiler.count_query)
+        card_query = CardQuery(conn)
+        while True:
+            work, callback, args = self.jobs.get()
+            try:
+                self.dispatcher.post(callback, *args, work(card_query))
+            except Exception as e:
+                print(f"Error running database query: {e}")
+            finally:
+                self.jobs.task_done()
 
 class DeckBuilderApp:
-    def __init__(self, root):
+    def __init__(self, root, profiler=None, catalog=None):
         self.root = root
         self.root.title("Deck Builder")
         self.root.geometry("1920x1080")  # Adjust the window size as needed
 
-        # Connect to the SQLite database
-        self.conn = sqlite3.connect('cards.db')
-        self.c = self.conn.cursor()
+        # Stage timings, SQL counts and image latencies for the debug overlay (no-op unless enabled)
+        self.profiler = profiler or Profiler()
 
         print("Initializing...")
 
-        # Card image caches
-        self.card_images = {}
-        self.original_images = {}
-
-        # Queue for thread-safe image loading
-        self.image_queue = queue.Queue()
-
-        # Load card metadata (without images)
-        self.cards = self.load_card_metadata()
+        # Card image caches: thumbnails for the grid, full-size art decoded only when opened
+        self.card_images = ImageCache(THUMBNAIL_CACHE_BYTES)
+        self.original_images = ImageCache(FULL_IMAGE_CACHE_BYTES)
+        self.missing_images = set()
+        # Grid thumbnail variant: _mini@2x.png on HiDPI screens so cards keep their physical size
+        scale = float(self.root.tk.call('tk', 'scaling')) * 72 / 96
+        self.thumbnail_suffix = 'mini@2x' if scale >= HIDPI_SCALE else 'mini'
+        # Mapped by load_thumbnail_atlas once prepare_thumbnails brought the atlases up to date;
+        # until then thumbnails are decoded from the thumbnail files
+        self.thumbnail_atlas = ThumbnailAtlas(atlas_dir=None)
+
+        # Card metadata (without images) in an in-memory catalog, from the snapshot when the caller has it
+        self.catalog = catalog or self.load_card_metadata()
+        self.facets = FacetIndex(self.catalog)
+        # Built by the first fuzzy search, on a query worker thread
+        self.fuzzy_index = None
+        self.fuzzy_index_lock = threading.Lock()
 
         print("Initialization done.")
 
         # Create the GUI widgets
         self.create_widgets()
 
-        self.deck_count = {}
-        self.evolved_deck_count = {}
-
-        # Start a thread to process the image queue
-        self.image_thread = threading.Thread(target=self.process_image_queue)
-        self.image_thread.daemon = True
-        self.image_thread.start()
+        # Deck model; deck_count and evolved_deck_count are its two sections
+        self.deck = Deck(self.catalog)
+        self.deck_count = self.deck.main
+        self.evolved_deck_count = self.deck.evolved
+        # Owned copies per card code; while it is empty nothing is marked as missing
+        self.collection = Collection()
+        self.deck_missing = {}
+        self.library = DeckLibrary(self.catalog, collection_db=COLLECTION_DB)
+        self.library_window = None
+        # Co-occurrence of cards in the library decks, synced with the library when it changed
+        self.synergy = SynergyIndex()
+        self.synergy_stale = True
+
+        # Debounced filtering: pending after() job, generation of the latest request and the last requested state
+        self.pending_filter_job = None
+        self.filter_generation = 0
+        self.rendered_filter_state = None
+
+        # Filter queries run on database worker threads; results of superseded queries are dropped
+        self.dispatcher = TkDispatcher(self.root)
+        self.query_worker = QueryWorker(self.dispatcher, profiler=self.profiler)
+        self.query_generation = 0
+        self.displayed_filter_state = None
+
+        # Decode thumbnails on a pool of worker threads; PhotoImage conversion stays on the Tk thread
+        self.image_loader = ImageLoader(self.decode_card_image, self.deliver_card_image, profiler=self.profiler)
+        self.image_generation = 0
+
+        if self.profiler.enabled:
+            self.create_debug_overlay()
+
+        # Show the window first: the grid fills in as the first query and the thumbnails arrive
+        self.root.after_idle(self.update_card_list)
+        if os.path.isdir("card_images"):
+            threading.Thread(target=self.prepare_thumbnails, daemon=True).start()
+
+    def prepare_thumbnails(self):
+        # Background thread: generate missing thumbnails and repack changed atlases, then have
+        # the Tk thread map the atlases
+        from thumbnails import generate_thumbnails
+        try:
+            report = generate_thumbnails()
+        except Exception as e:
+            print(f"Error generating thumbnails: {e}")
+            return
+        if report['sources']:
+            print(f"Generated {report['thumbnails']} thumbnail(s) from {report['sources']} card image(s) "
+                  f"in {report['seconds']:.1f} s ({report['sources_per_second']} images/s).")
+        for error in report['errors']:
+            print(f"Error generating thumbnails for {error['file']}: {error['error']}")
+        try:
+            packed = build_thumbnail_atlases(suffix=self.thumbnail_suffix)
+        except Exception as e:
+            print(f"Error packing thumbnail atlases: {e}")
+            return
+        if packed:
+            print(f"Packed thumbnails for {len(packed)} card set(s).")
+        self.dispatcher.post(self.load_thumbnail_atlas, bool(report['thumbnails'] or packed))
+
+    def load_thumbnail_atlas(self, changed):
+        # Swap in the packed thumbnails. When thumbnails were (re)generated, images decoded or
+        # found missing before are stale, so the visible cards are loaded again.
+        previous = self.thumbnail_atlas
+        self.thumbnail_atlas = ThumbnailAtlas(suffix=self.thumbnail_suffix)
+        previous.close()
+        if not changed:
+            return
+        self.card_images = ImageCache(THUMBNAIL_CACHE_BYTES)
+        self.missing_images.clear()
+        for card_label, item in self.label_pool:
+            card_label.card = None
+        self.layout_grid()
+
+    def get_fuzzy_index(self):
+        # Query worker threads: build the fuzzy index on first use
+        with self.fuzzy_index_lock:
+            if self.fuzzy_index is None:
+                with self.profiler.stage("fuzzy index"):
+                    self.fuzzy_index = FuzzyIndex(self.catalog)
+            return self.fuzzy_index
 
     def load_card_metadata(self):
         # Load card metadata from the database
-        self.c.execute("SELECT name, code FROM cards")
-        cards = self.c.fetchall()
-        return {card[0]: card[1] for card in cards}
-
-    def load_card_image(self, card_name):
-        # Load a single card image (called lazily)
-        code = self.cards[card_name]
+        conn = connect_read_only('cards.db')
         try:
-            image = Image.open(f"card_images/{code}.png")
-            self.original_images[card_name] = ImageTk.PhotoImage(image)
-            image2 = Image.open(f"card_images/{code}_mini.png")
-            self.card_images[card_name] = ImageTk.PhotoImage(image2)
+            return CardCatalog.from_db(conn.cursor())
+        finally:
+            conn.close()
+
+    def decode_card_image(self, card_name):
+        # Decode a single card thumbnail on an image worker thread, None if it can't be loaded
+        code = self.catalog.get(card_name).code
+        image = self.thumbnail_atlas.get(code)
+        if image is not None:
+            return image
+        from PIL import Image
+        # Without a generated _mini@2x.png the grid falls back to the regular thumbnail
+        for suffix in dict.fromkeys((self.thumbnail_suffix, 'mini')):
+            try:
+                image = Image.open(f"card_images/{code}_{suffix}.png")
+                image.load()
+                return image
+            except FileNotFoundError:
+                continue
+            except Exception as e:
+                print(f"Error loading image for card {card_name}: {e}")
+                return None
+        print(f"Image not found for card: {card_name}")
+        return None
+
+    def deliver_card_image(self, card_name, image):
+        # Hand a decoded thumbnail from the worker thread over to the Tk thread
+        self.dispatcher.post(self.update_card_label, card_name, image)
+
+    def load_original_image(self, card_name):
+        # Decode the enlarged card on demand: the _zoom.png thumbnail, or the full-size art
+        # until the thumbnails have been generated
+        original_image = self.original_images.get(card_name)
+        if original_image is not None:
+            return original_image
+        code = self.catalog.get(card_name).code
+        path = f"card_images/{code}_zoom.png"
+        if not os.path.exists(path):
+            path = f"card_images/{code}.png"
+        try:
+            from PIL import Image, ImageTk
+            original_image = ImageTk.PhotoImage(Image.open(path))
         except FileNotFoundError:
             print(f"Image not found for card: {card_name}")
-            self.card_images[card_name] = None
-            self.original_images[card_name] = None
+            return None
         except Exception as e:
             print(f"Error loading image for card {card_name}: {e}")
+            return None
+        self.original_images.put(card_name, original_image)
+        return original_image
 
     def create_widgets(self):
         # Create the filter frames
@@ -77,7 +473,6 @@ class DeckBuilderApp:
 
         self.class_var = tk.StringVar(value="All")
         self.class_combobox = ttk.Combobox(filter_frame1, textvariable=self.class_var)
-        self.class_combobox['values'] = ["All"] + self.get_class()
         self.class_combobox.pack(side=tk.LEFT, padx=5)
         self.class_combobox.bind("<<ComboboxSelected>>", self.update_card_list)
 
@@ -87,7 +482,13 @@ class DeckBuilderApp:
 
         self.name_filter_entry = ttk.Entry(filter_frame1)
         self.name_filter_entry.pack(side=tk.LEFT, padx=5)
-        self.name_filter_entry.bind("<KeyRelease>", self.update_card_list)
+        self.name_filter_entry.bind("<KeyRelease>", self.schedule_card_list_update)
+
+        # Fuzzy name/trait matching: tolerates typos and missing punctuation, best matches first
+        self.fuzzy_search_var = tk.BooleanVar()
+        self.fuzzy_search_checkbutton = ttk.Checkbutton(
+            filter_frame1, text="Fuzzy", variable=self.fuzzy_search_var, command=self.update_card_list)
+        self.fuzzy_search_checkbutton.pack(side=tk.LEFT, padx=5)
 
         # Type filter
         self.type_filter_label = ttk.Label(filter_frame1, text="Filter by Type:")
@@ -95,7 +496,6 @@ class DeckBuilderApp:
 
         self.type_var = tk.StringVar()
         self.type_combobox = ttk.Combobox(filter_frame1, textvariable=self.type_var)
-        self.type_combobox['values'] = ["", "Follower", "Spell", "Amulet"]
         self.type_combobox.pack(side=tk.LEFT, padx=5)
         self.type_combobox.bind("<<ComboboxSelected>>", self.update_card_list)
 
@@ -105,7 +505,6 @@ class DeckBuilderApp:
 
         self.universe_var = tk.StringVar()
         self.universe_combobox = ttk.Combobox(filter_frame1, textvariable=self.universe_var)
-        self.universe_combobox['values'] = ["", "Shadowverse", "Umamusume", "Cinderella Girls"]
         self.universe_combobox.pack(side=tk.LEFT, padx=5)
         self.universe_combobox.bind("<<ComboboxSelected>>", self.update_card_list)
 
@@ -115,7 +514,6 @@ class DeckBuilderApp:
 
         self.rarity_var = tk.StringVar()
         self.rarity_combobox = ttk.Combobox(filter_frame2, textvariable=self.rarity_var)
-        self.rarity_combobox['values'] = ["", "Legendary", "Gold", "Silver", "Bronze"]
         self.rarity_combobox.pack(side=tk.LEFT, padx=5)
         self.rarity_combobox.bind("<<ComboboxSelected>>", self.update_card_list)
 
@@ -125,7 +523,6 @@ class DeckBuilderApp:
 
         self.evolved_var = tk.StringVar()
         self.evolved_combobox = ttk.Combobox(filter_frame2, textvariable=self.evolved_var)
-        self.evolved_combobox['values'] = ["", "Base", "Evolve"]
         self.evolved_combobox.pack(side=tk.LEFT, padx=5)
         self.evolved_combobox.bind("<<ComboboxSelected>>", self.update_card_list)
 
@@ -135,7 +532,6 @@ class DeckBuilderApp:
 
         self.cost_var = tk.StringVar(value="All")
         self.cost_combobox = ttk.Combobox(filter_frame2, textvariable=self.cost_var, state="readonly")
-        self.cost_combobox['values'] = ["All"] + list(range(16))
         self.cost_combobox.pack(side=tk.LEFT, padx=5)
         self.cost_combobox.bind("<<ComboboxSelected>>", self.update_card_list)
 
@@ -145,7 +541,7 @@ class DeckBuilderApp:
 
         self.trait_filter_entry = ttk.Entry(filter_frame2)
         self.trait_filter_entry.pack(side=tk.LEFT, padx=5)
-        self.trait_filter_entry.bind("<KeyRelease>", self.update_card_list)
+        self.trait_filter_entry.bind("<KeyRelease>", self.schedule_card_list_update)
 
         # Show only cards in deck filter
         self.show_only_in_deck_var = tk.BooleanVar()
@@ -169,27 +565,50 @@ class DeckBuilderApp:
 
         self.card_set_var = tk.StringVar(value="All")
         self.card_set_combobox = ttk.Combobox(filter_frame2, textvariable=self.card_set_var, state="readonly")
-        self.card_set_combobox['values'] = ["All"] + self.get_card_sets()
         self.card_set_combobox.pack(side=tk.LEFT, padx=5) 
         self.card_set_combobox.bind("<<ComboboxSelected>>", self.update_card_list)
 
+        # Filter comboboxes backed by the facet index: (facet, combobox, variable, [(shown value, facet value)]).
+        # A facet value of None is the "no filter" choice.
+        self.facet_comboboxes = [
+            ('class', self.class_combobox, self.class_var,
+             [("All", None)] + [(card_class, card_class) for card_class in self.get_class()]),
+            ('type', self.type_combobox, self.type_var,
+             [("", None), ("Follower", "Follower"), ("Spell", "Spell"), ("Amulet", "Amulet")]),
+            ('universe', self.universe_combobox, self.universe_var,
+             [("", None), ("Shadowverse", "Shadowverse"), ("Umamusume", "Umamusume"),
+              ("Cinderella Girls", "Cinderella Girls")]),
+            ('rarity', self.rarity_combobox, self.rarity_var,
+             [("", None), ("Legendary", "Legendary"), ("Gold", "Gold"), ("Silver", "Silver"), ("Bronze", "Bronze")]),
+            ('evolved', self.evolved_combobox, self.evolved_var, [("", None), ("Base", "no"), ("Evolve", "yes")]),
+            ('cost', self.cost_combobox, self.cost_var, [("All", None)] + [(str(cost), cost) for cost in range(16)]),
+            ('card_set', self.card_set_combobox, self.card_set_var,
+             [("All", None)] + [(card_set, card_set) for card_set in self.get_card_sets()]),
+        ]
+        for facet, combobox, variable, choices in self.facet_comboboxes:
+            combobox.configure(postcommand=lambda combobox=combobox, facet=facet, choices=choices:
+                               combobox.after_idle(self.grey_out_empty_facets, combobox, facet, choices))
+        self.facet_counts = self.facets.counts({})
+        self.update_facet_labels()
+
         # Frame for cards and scrollbar
         self.card_frame = tk.Frame(self.root)
         self.card_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5, side=tk.LEFT)
 
         self.canvas = tk.Canvas(self.card_frame)
         self.scrollbar = ttk.Scrollbar(self.card_frame, orient="vertical", command=self.canvas.yview)
-        self.scrollable_frame = ttk.Frame(self.canvas)
 
-        self.scrollable_frame.bind(
-            "<Configure>",
-            lambda e: self.canvas.configure(
-                scrollregion=self.canvas.bbox("all")
-            )
-        )
+        # Virtualized grid: the filtered cards plus a pool of labels rebound to whichever rows are in view
+        self.grid_cards = []
+        self.label_pool = []
+        self.card_labels = {}
+        self.cell_width, self.cell_height = DEFAULT_CELL_SIZE
+        self.cell_size_measured = False
+        # First row bound by the last render; scroll callbacks within that row have nothing to rebind
+        self.rendered_first_row = None
 
-        self.canvas.create_window((0, 0), window=self.scrollable_frame, anchor="nw")
-        self.canvas.configure(yscrollcommand=self.scrollbar.set)
+        self.canvas.configure(yscrollcommand=self.on_canvas_scroll)
+        self.canvas.bind("<Configure>", self.on_canvas_resize)
 
         self.canvas.pack(side="left", fill="both", expand=True)
         self.scrollbar.pack(side="right", fill="y")
@@ -211,6 +630,7 @@ class DeckBuilderApp:
         # Increase the width of the deck listbox
         self.deck_listbox = tk.Listbox(self.deck_frame, height=20, width=50)
         self.deck_listbox.pack(fill=tk.BOTH, expand=True)
+        self.deck_listbox_cards = []
         self.deck_listbox.bind("<Double-Button-1>", self.remove_from_deck)
 
         # Frame for evolved deck
@@ -223,6 +643,7 @@ class DeckBuilderApp:
         # Increase the width of the evolved deck listbox
         self.evolved_deck_listbox = tk.Listbox(self.evolved_deck_frame, height=20, width=50)
         self.evolved_deck_listbox.pack(fill=tk.BOTH, expand=True)
+        self.evolved_deck_listbox_cards = []
         self.evolved_deck_listbox.bind("<Double-Button-1>", self.remove_from_evolved_deck)
 
         # Frame for buttons
@@ -241,144 +662,324 @@ class DeckBuilderApp:
         self.import_deck_button = ttk.Button(button_frame, text="Import Deck", command=self.import_deck)
         self.import_deck_button.pack(side=tk.LEFT, padx=5)
 
+        # Share decks as short codes through the clipboard
+        self.copy_code_button = ttk.Button(button_frame, text="Copy Deck Code", command=self.copy_deck_code)
+        self.copy_code_button.pack(side=tk.LEFT, padx=5)
+        self.paste_code_button = ttk.Button(button_frame, text="Paste Deck Code", command=self.paste_deck_code)
+        self.paste_code_button.pack(side=tk.LEFT, padx=5)
+
+        # Deck library buttons
+        self.save_library_button = ttk.Button(button_frame, text="Save to Library", command=self.save_to_library)
+        self.save_library_button.pack(side=tk.LEFT, padx=5)
+        self.open_library_button = ttk.Button(button_frame, text="Library", command=self.open_library)
+        self.open_library_button.pack(side=tk.LEFT, padx=5)
+
+        # Collection buttons: owned copies of the selected deck entry, or of the whole deck
+        self.set_owned_button = ttk.Button(button_frame, text="Set Owned", command=self.set_owned_quantity)
+        self.set_owned_button.pack(side=tk.LEFT, padx=5)
+        self.own_deck_button = ttk.Button(button_frame, text="Own Deck", command=self.add_deck_to_collection)
+        self.own_deck_button.pack(side=tk.LEFT, padx=5)
+
         # Labels for displaying total counts of Spells, Amulets, and Followers
         self.deck_totals_label = ttk.Label(self.deck_frame, text="Spells: 0, Amulets: 0, Followers: 0")
         self.deck_totals_label.pack()
 
+        # Deck analytics: mana curve, class/trait mix and draw odds (selecting a deck entry adds its odds)
+        self.selected_stats_card = None
+        self.going_second_var = tk.BooleanVar()
+        stats_frame = tk.Frame(self.main_frame)
+        stats_frame.pack(fill=tk.X, padx=5, pady=5)
+        self.going_second_checkbutton = ttk.Checkbutton(
+            stats_frame, text="Going second", variable=self.going_second_var, command=self.update_deck_stats)
+        self.going_second_checkbutton.pack(anchor="w")
+        self.deck_stats_label = ttk.Label(stats_frame, font="TkFixedFont", justify=tk.LEFT)
+        self.deck_stats_label.pack(anchor="w")
+
+        # Monte Carlo opening-hand simulation, run off the Tk thread
+        self.simulation_generation = 0
+        self.simulate_button = ttk.Button(stats_frame, text="Simulate Openings", command=self.start_simulation)
+        self.simulate_button.pack(anchor="w")
+        self.simulation_label = ttk.Label(stats_frame, font="TkFixedFont", justify=tk.LEFT)
+        self.simulation_label.pack(anchor="w")
+
+        # Cards often played with the deck in the library decks; double-click adds one
+        self.suggestion_label = ttk.Label(stats_frame, text="Played with this deck:")
+        self.suggestion_label.pack(anchor="w")
+        self.suggestion_listbox = tk.Listbox(stats_frame, height=8, width=50)
+        self.suggestion_listbox.pack(fill=tk.X)
+        self.suggestion_listbox_cards = []
+        self.suggestion_listbox.bind("<Double-Button-1>", self.add_suggested_card)
+        self.deck_listbox.bind("<<ListboxSelect>>", self.select_stats_card)
+
     def get_class(self):
-        # Retrieve distinct classes from the database
-        self.c.execute("SELECT DISTINCT class FROM cards")
-        classes = [row[0] for row in self.c.fetchall()]
-        return classes
+        # Retrieve distinct classes from the facet index
+        return self.facets.values('class')
 
     def get_card_sets(self):
-        # Retrieve distinct card sets from the database
-        self.c.execute("SELECT DISTINCT card_set FROM cards")
-        sets = [row[0] for row in self.c.fetchall()]
-        return sets
+        # Retrieve distinct card sets from the facet index
+        return self.facets.values('card_set')
+
+    def update_facet_labels(self):
+        # Show how many cards each combobox value would match, given the other filters
+        for facet, combobox, variable, choices in self.facet_comboboxes:
+            counts = self.facet_counts[facet]
+            labels = [shown if value is None else f"{shown} ({counts.get(value, 0)})" for shown, value in choices]
+            combobox['values'] = labels
+            current = FACET_COUNT_SUFFIX.sub("", variable.get())
+            for label, (shown, value) in zip(labels, choices):
+                if shown == current:
+                    variable.set(label)
+                    break
+
+    def grey_out_empty_facets(self, combobox, facet, choices):
+        # Grey out dropdown values that would match no cards (runs once the dropdown list is filled)
+        try:
+            listbox = combobox.tk.call("ttk::combobox::PopdownWindow", combobox) + ".f.l"
+            counts = self.facet_counts[facet]
+            for index, (shown, value) in enumerate(choices):
+                empty = value is not None and counts.get(value, 0) == 0
+                combobox.tk.call(listbox, "itemconfigure", index, "-foreground", "grey" if empty else "")
+        except tk.TclError:
+            pass
+
+    def get_filter_state(self):
+        # Snapshot the current value of every filter widget, without the match counts shown in the comboboxes
+        return FilterState(
+            selected_class=FACET_COUNT_SUFFIX.sub("", self.class_var.get()),
+            name_filter=self.name_filter_entry.get().strip(),
+            type_filter=FACET_COUNT_SUFFIX.sub("", self.type_var.get().strip()),
+            universe_filter=FACET_COUNT_SUFFIX.sub("", self.universe_var.get().strip()),
+            rarity_filter=FACET_COUNT_SUFFIX.sub("", self.rarity_var.get().strip()),
+            evolved_filter=FACET_COUNT_SUFFIX.sub("", self.evolved_var.get().strip()),
+            cost_filter=FACET_COUNT_SUFFIX.sub("", self.cost_var.get()),
+            trait_filter=self.trait_filter_entry.get().strip(),
+            show_only_in_deck=self.show_only_in_deck_var.get(),
+            sort_option=self.sort_var.get(),
+            card_set_filter=FACET_COUNT_SUFFIX.sub("", self.card_set_var.get().strip()),
+            fuzzy_search=self.fuzzy_search_var.get())
+
+    def schedule_card_list_update(self, *args):
+        # Coalesce a burst of filter edits (typing) into a single refresh of the latest state
+        self.filter_generation += 1
+        if self.pending_filter_job is not None:
+            self.root.after_cancel(self.pending_filter_job)
+        self.pending_filter_job = self.root.after(
+            FILTER_DEBOUNCE_MS, self.run_scheduled_update, self.filter_generation)
+
+    def run_scheduled_update(self, generation):
+        # Evaluate a debounced filter change unless a newer one superseded it
+        self.pending_filter_job = None
+        if generation != self.filter_generation:
+            return
+        # Keys that don't change the text (arrows, shift, ...) leave the grid as it is
+        if self.get_filter_state() == self.rendered_filter_state:
+            return
+        self.update_card_list()
 
     def update_card_list(self, *args):
-        # Update the card list based on the selected filters and sort option
-        selected_class = self.class_var.get()
-        name_filter = self.name_filter_entry.get().strip()
-        type_filter = self.type_var.get().strip()
-        universe_filter = self.universe_var.get().strip()
-        rarity_filter = self.rarity_var.get().strip()
-        evolved_filter = self.evolved_var.get().strip()
-        cost_filter = self.cost_var.get()
-        trait_filter = self.trait_filter_entry.get().strip()
-        show_only_in_deck = self.show_only_in_deck_var.get()
-        sort_option = self.sort_var.get()
-        card_set_filter = self.card_set_var.get().strip()
-
-        query = "SELECT name, cost FROM cards WHERE 1=1"
-        parameters = []
-
-        if selected_class != "All":
-            query += " AND class=?"
-            parameters.append(selected_class)
-        if name_filter:
-            query += " AND name LIKE ?"
-            parameters.append(f"%{name_filter}%")
-        if type_filter:
-            query += " AND type=?"
-            parameters.append(type_filter)
-        if universe_filter:
-            query += " AND universe=?"
-            parameters.append(universe_filter)
-        if card_set_filter != "All":
-            query += " AND card_set=?"
-            parameters.append(card_set_filter)
-        if rarity_filter:
-            query += " AND rarity=?"
-            parameters.append(rarity_filter)
-        if evolved_filter:
-            if evolved_filter == "Base":
-                query += " AND evolved=?"
-                parameters.append("no")
-            elif evolved_filter == "Evolve":
-                query += " AND evolved=?"
-                parameters.append("yes")
-        if cost_filter != "All":
-            query += " AND cost=?"
-            parameters.append(cost_filter)
-        if trait_filter:
-            query += " AND trait LIKE ?"
-            parameters.append(f"%{trait_filter}%")
-        if show_only_in_deck:
-            cards_in_deck = list(self.deck_count.keys()) + list(self.evolved_deck_count.keys())
-            if cards_in_deck:
-                query += " AND name IN ({seq})".format(seq=','.join(['?']*len(cards_in_deck)))
-                parameters.extend(cards_in_deck)
-
-        self.c.execute(query, parameters)
-        cards = self.c.fetchall()
-
-        if sort_option == "Cost":
-            cards.sort(key=lambda x: x[1])
-        elif sort_option == "Alphabetical":
-            cards.sort(key=lambda x: x[0])
-
-        # Clear the current card display
-        for widget in self.scrollable_frame.winfo_children():
-            widget.destroy()
-
-        # Display the cards in a grid (with 9 columns per row)
-        self.card_labels = {}
-        for i, (card, cost) in enumerate(cards):
-            if card not in self.card_images:
-                # Lazy load the image
-                self.image_queue.put(card)
-            if card in self.card_images and self.card_images[card]:
-                card_label = ttk.Label(self.scrollable_frame, image=self.card_images[card])
-                card_label.image = self.card_images[card]
-                card_label.grid(row=i // 9, column=i % 9, padx=5, pady=5)
-                card_label.bind("<Button-1>", lambda e, card=card: self.add_to_deck(e, card))
-                card_label.bind("<Button-2>", lambda e, card=card: self.show_large_image(e, card))  # Scroll wheel click
-                card_label.bind("<Button-3>", lambda e, card=card: self.remove_card_from_deck(e, card))  # Right click
-                card_label.bind("<Enter>", lambda e, card=card: self.show_card_name(e, card))
-                card_label.bind("<Leave>", lambda e: self.hide_card_name(e))
-                if card in self.deck_count or card in self.evolved_deck_count:
-                    card_label.config(borderwidth=2, relief="solid", background="yellow")
-                self.card_labels[card] = card_label
-            else:
-                card_label = ttk.Label(self.scrollable_frame, text=card)
-                card_label.grid(row=i // 9, column=i % 9, padx=5, pady=5)
-                card_label.bind("<Button-1>", lambda e, card=card: self.add_to_deck(e, card))
-                card_label.bind("<Button-2>", lambda e, card=card: self.show_large_image(e, card))  # Scroll wheel click
-                card_label.bind("<Button-3>", lambda e, card=card: self.remove_card_from_deck(e, card))  # Right click
-                card_label.bind("<Enter>", lambda e, card=card: self.show_card_name(e, card))
-                card_label.bind("<Leave>", lambda e: self.hide_card_name(e))
-                if card in self.deck_count or card in self.evolved_deck_count:
-                    card_label.config(borderwidth=2, relief="solid", background="yellow")
+        # Snapshot the filters and hand the query to a database worker; show_card_list renders the
+        # result unless a newer request was made in the meantime
+        state = self.get_filter_state()
+        self.rendered_filter_state = state
+        self.query_generation += 1
+        cards_in_deck = list(self.deck.card_names()) if state.show_only_in_deck else None
+        requested = time.perf_counter()
+        self.query_worker.submit(lambda card_query: self.filter_cards(card_query, state, cards_in_deck),
+                                 self.show_card_list, self.query_generation, state, requested)
+
+    def filter_cards(self, card_query, state, cards_in_deck):
+        # Worker thread: the grid cards and facet counts for a filter state
+        with self.profiler.action("filter_cards"):
+            (selected_class, name_filter, type_filter, universe_filter, rarity_filter, evolved_filter,
+             cost_filter, trait_filter, show_only_in_deck, sort_option, card_set_filter, fuzzy_search) = state
+
+            equals = {
+                'class': selected_class if selected_class != "All" else None,
+                'type': type_filter,
+                'universe': universe_filter,
+                'card_set': card_set_filter if card_set_filter != "All" else None,
+                'rarity': rarity_filter,
+                'evolved': {"Base": "no", "Evolve": "yes"}.get(evolved_filter),
+                'cost': int(cost_filter) if cost_filter != "All" else None,
+            }
+
+            with self.profiler.stage("query"):
+                if fuzzy_search and (name_filter or trait_filter):
+                    # Ranked fuzzy matches narrowed by the other filters in SQL, kept in rank order
+                    text_matches = self.get_fuzzy_index().search(name_filter, trait_filter)
+                    # An empty deck doesn't restrict the grid, as in the SQL path and the facet counts
+                    if cards_in_deck:
+                        deck_cards = set(cards_in_deck)
+                        text_matches = [card for card in text_matches if card in deck_cards]
+                    allowed = set()
+                    if text_matches:
+                        allowed = {card for card, cost in card_query.search(equals, names=text_matches)}
+                    cards = [card for card in text_matches if card in allowed]
+                else:
+                    text_matches = None
+                    cards = [card for card, cost in
+                             card_query.search(equals, name_filter, trait_filter, cards_in_deck, sort_option)]
+
+            with self.profiler.stage("facets"):
+                facet_counts = self.facets.counts(equals, name_filter, trait_filter, cards_in_deck, text_matches)
+        return cards, facet_counts
+
+    def show_card_list(self, generation, state, requested, result):
+        # Tk thread: render a finished query, unless a newer one has been requested since
+        if generation != self.query_generation:
+            return
+        with self.profiler.action("update_card_list"):
+            cards, self.facet_counts = result
+            self.update_facet_labels()
+            with self.profiler.stage("grid"):
+                self.apply_grid_results(cards, scroll_to_top=state != self.displayed_filter_state)
+            self.displayed_filter_state = state
+        self.profiler.latency("filter", (time.perf_counter() - requested) * 1000)
+
+    def apply_grid_results(self, cards, scroll_to_top=False):
+        # Apply a new result list to the grid. Labels whose slot still shows the same card are kept
+        # as they are, and an unchanged result list only costs a highlight check of the visible cards.
+        if cards == self.grid_cards:
+            for card in self.card_labels:
+                self.update_card_background(card)
+            return
+        self.grid_cards = cards
+        self.layout_grid(scroll_to_top)
+
+    def layout_grid(self, scroll_to_top=False):
+        # Size the scroll region for the whole result set, but only bind widgets for the visible rows
+        rows = math.ceil(len(self.grid_cards) / CARD_COLUMNS)
+        self.canvas.configure(scrollregion=(0, 0, CARD_COLUMNS * self.cell_width, rows * self.cell_height))
+        if scroll_to_top:
+            self.canvas.yview_moveto(0)
+        self.resize_label_pool()
+        # Cell positions depend on the result list and cell size, place every pooled label again
+        for card_label, item in self.label_pool:
+            card_label.index = None
+        self.render_visible_cards()
+
+    def create_pool_label(self):
+        # Create a reusable grid label; its bindings act on whichever card it currently shows
+        card_label = ttk.Label(self.canvas, wraplength=self.cell_width - 2 * CARD_PADDING)
+        card_label.card = None
+        card_label.index = None
+        card_label.highlighted = None
+        card_label.bind("<Button-1>", lambda e: self.add_to_deck(e, e.widget.card))
+        card_label.bind("<Button-2>", lambda e: self.show_large_image(e, e.widget.card))  # Scroll wheel click
+        card_label.bind("<Button-3>", lambda e: self.remove_card_from_deck(e, e.widget.card))  # Right click
+        card_label.bind("<Enter>", lambda e: self.show_card_name(e, e.widget.card))
+        card_label.bind("<Leave>", lambda e: self.hide_card_name(e))
+        item = self.canvas.create_window(0, 0, window=card_label, anchor="nw", state="hidden")
+        self.label_pool.append((card_label, item))
+
+    def resize_label_pool(self):
+        # Keep enough labels for the rows that fit in the viewport, plus one partially visible row
+        visible_rows = self.canvas.winfo_height() // self.cell_height + 2
+        needed = visible_rows * CARD_COLUMNS
+        while len(self.label_pool) < needed:
+            self.create_pool_label()
+        while len(self.label_pool) > needed:
+            card_label, item = self.label_pool.pop()
+            self.canvas.delete(item)
+            card_label.destroy()
+
+    def first_visible_row(self):
+        return max(0, int(self.canvas.canvasy(0)) // self.cell_height)
+
+    def render_visible_cards(self):
+        # Rebind the label pool to the cards in the rows currently scrolled into view
+        with self.profiler.stage("render"):
+            first_row = self.first_visible_row()
+            self.rendered_first_row = first_row
+            first_index = first_row * CARD_COLUMNS
+            # Requests from the latest view outrank those queued for views scrolled past
+            self.image_generation += 1
+            self.card_labels = {}
+            for slot, (card_label, item) in enumerate(self.label_pool):
+                index = first_index + slot
+                if index >= len(self.grid_cards):
+                    if card_label.card is not None:
+                        card_label.card = None
+                        card_label.index = None
+                        self.canvas.itemconfigure(item, state="hidden")
+                    continue
+                card = self.grid_cards[index]
+                if card_label.index != index:
+                    if card_label.index is None:
+                        self.canvas.itemconfigure(item, state="normal")
+                    card_label.index = index
+                    row, column = divmod(index, CARD_COLUMNS)
+                    self.canvas.coords(item, column * self.cell_width + CARD_PADDING, row * self.cell_height + CARD_PADDING)
+                if card_label.card != card:
+                    card_label.card = card
+                    self.show_card_on_label(card_label, card)
+                if card_label.image is None:
+                    self.request_card_image(card, 0, slot)
                 self.card_labels[card] = card_label
+                self.update_card_background(card)
 
-    def process_image_queue(self):
-        while True:
-            card = self.image_queue.get()
-            if card is None:
-                break
-            self.load_card_image(card)
-            self.root.after(0, self.update_card_label, card)
-            self.image_queue.task_done()
-
-    def update_card_label(self, card):
-        if card in self.card_labels and self.card_images[card]:
-            self.card_labels[card].config(image=self.card_images[card])
-            self.card_labels[card].image = self.card_images[card]
+            # Prefetch the next screen behind the visible cards
+            prefetch_start = first_index + len(self.label_pool)
+            for offset, card in enumerate(self.grid_cards[prefetch_start:prefetch_start + len(self.label_pool)]):
+                if card not in self.card_images:
+                    self.request_card_image(card, 1, offset)
+
+    def request_card_image(self, card, tier, position):
+        # Queue a thumbnail decode: newest view first, then visible before prefetched, then grid order
+        if card not in self.missing_images:
+            self.image_loader.request(card, (-self.image_generation, tier, position))
+            self.profiler.gauge("image queue", self.image_loader.depth())
+
+    def show_card_on_label(self, card_label, card):
+        # Show the card's thumbnail, or its name while the image is loading or missing
+        image = self.card_images.get(card)
+        if image:
+            card_label.config(image=image, text="")
+            card_label.image = image
+        else:
+            card_label.config(image="", text=card)
+            card_label.image = None
+
+    def on_canvas_scroll(self, first, last):
+        # Keep the scrollbar in sync and rebind the pool to the newly visible rows. Tk also calls this
+        # after layout_grid changed the scroll region, when the grid was just rendered for that view.
+        self.scrollbar.set(first, last)
+        if self.first_visible_row() != self.rendered_first_row:
+            self.render_visible_cards()
+
+    def on_canvas_resize(self, event):
+        # The number of visible rows depends on the canvas height
+        self.resize_label_pool()
+        self.render_visible_cards()
+
+    def update_card_label(self, card, decoded_image):
+        # Convert a decoded thumbnail into a PhotoImage (Tk thread only) and show it if the card is in view
+        self.image_loader.complete(card)
+        self.profiler.gauge("image queue", self.image_loader.depth())
+        if decoded_image is None:
+            self.missing_images.add(card)
+            return
+        from PIL import ImageTk
+        start = time.perf_counter()
+        image = ImageTk.PhotoImage(decoded_image)
+        self.profiler.latency("photoimage", (time.perf_counter() - start) * 1000)
+        self.card_images.put(card, image)
+        if not self.cell_size_measured:
+            # Size the grid cells after the first real thumbnail
+            self.cell_size_measured = True
+            self.cell_width = image.width() + 2 * CARD_PADDING
+            self.cell_height = image.height() + 2 * CARD_PADDING
+            for card_label, item in self.label_pool:
+                card_label.config(wraplength=self.cell_width - 2 * CARD_PADDING)
+            self.layout_grid()
+        if card in self.card_labels:
+            self.card_labels[card].config(image=image, text="")
+            self.card_labels[card].image = image
 
     def add_to_deck(self, event, card):
-        # Add a card to the deck
-        if self.get_card_evolved(card) == "yes":
-            evolved_deck_count = self.evolved_deck_count.get(card, 0)
-            if evolved_deck_count < 3:
-                self.evolved_deck_count[card] = evolved_deck_count + 1
-                self.update_deck_display()
-                self.update_card_background(card)
-        else:
-            deck_count = self.deck_count.get(card, 0)
-            if deck_count < 3:
-                self.deck_count[card] = deck_count + 1
+        # Add a card to the deck (evolved cards go to the evolved deck)
+        with self.profiler.action("add_to_deck"):
+            if self.deck.add(card):
                 self.update_deck_display()
                 self.update_card_background(card)
 
@@ -386,12 +987,8 @@ class DeckBuilderApp:
         # Remove a card from the deck
         selection = self.deck_listbox.curselection()
         if selection:
-            card = self.deck_listbox.get(selection[0]).split(') ')[1].split(' (')[0]
-            deck_count = self.deck_count.get(card, 0)
-            if deck_count > 0:
-                self.deck_count[card] -= 1
-                if self.deck_count[card] == 0:
-                    del self.deck_count[card]
+            card = self.deck_listbox_cards[selection[0]]
+            self.deck.remove(card, self.deck.main)
             self.update_deck_display()
             self.update_card_background(card)
 
@@ -399,156 +996,412 @@ class DeckBuilderApp:
         # Remove a card from the evolved deck
         selection = self.evolved_deck_listbox.curselection()
         if selection:
-            # Extract the entire card name including (Evolved)
-            selected_item = self.evolved_deck_listbox.get(selection[0])
-            card_parts = selected_item.split(' (')
-            card = ' ('.join(card_parts[:-1]).split(') ')[1]
-            print(f"Selected item: {selected_item}")
-            print(f"Card to remove: {card}")
-
-            evolved_deck_count = self.evolved_deck_count.get(card, 0)
-            if evolved_deck_count > 0:
-                self.evolved_deck_count[card] -= 1
-                if self.evolved_deck_count[card] == 0:
-                    del self.evolved_deck_count[card]
+            card = self.evolved_deck_listbox_cards[selection[0]]
+            self.deck.remove(card, self.deck.evolved)
             self.update_deck_display()
             self.update_card_background(card)
 
     def remove_card_from_deck(self, event, card):
         # Remove a card from the deck or evolved deck by right-clicking
-        if self.get_card_evolved(card) == "yes":
-            evolved_deck_count = self.evolved_deck_count.get(card, 0)
-            if evolved_deck_count > 0:
-                self.evolved_deck_count[card] -= 1
-                if self.evolved_deck_count[card] == 0:
-                    del self.evolved_deck_count[card]
-        else:
-            deck_count = self.deck_count.get(card, 0)
-            if deck_count > 0:
-                self.deck_count[card] -= 1
-                if self.deck_count[card] == 0:
-                    del self.deck_count[card]
-        self.update_deck_display()
-        self.update_card_background(card)
+        with self.profiler.action("remove_card_from_deck"):
+            self.deck.remove(card)
+            self.update_deck_display()
+            self.update_card_background(card)
 
     def show_large_image(self, event, card):
         # Show the original version of the card in a new window
-        if card in self.original_images:
-            original_image = self.original_images[card]
-            if original_image:
-                large_image_window = tk.Toplevel(self.root)
-                large_image_window.title(card)
-                large_image_label = ttk.Label(large_image_window, image=original_image)
-                large_image_label.image = original_image
-                large_image_label.pack()
+        original_image = self.load_original_image(card)
+        if original_image:
+            large_image_window = tk.Toplevel(self.root)
+            large_image_window.title(card)
+            large_image_label = ttk.Label(large_image_window, image=original_image)
+            large_image_label.image = original_image
+            large_image_label.pack()
 
     def update_deck_display(self):
         # Update the display of the deck and evolved deck
+        # Card names are kept per listbox row so selections never have to parse the display text
         self.deck_listbox.delete(0, tk.END)
         self.evolved_deck_listbox.delete(0, tk.END)
+        self.deck_listbox_cards = []
+        self.evolved_deck_listbox_cards = []
+        # Copies short of the collection, shown in the lists and as the grid highlight
+        self.deck_missing = self.collection.missing(self.deck) if len(self.collection) else {}
 
         # Update regular deck display
-        sorted_deck = sorted(self.deck_count.items(), key=lambda x: self.get_card_cost(x[0]))
-        for card, count in sorted_deck:
-            card_cost = self.get_card_cost(card)
-            display_name = f"({card_cost}) {card}"
-            self.deck_listbox.insert(tk.END, f"{display_name} ({count})")
+        for card_cost, card, count in self.deck.sorted_entries(self.deck.main):
+            self.insert_deck_entry(self.deck_listbox, card_cost, card, count)
+            self.deck_listbox_cards.append(card)
 
         # Update evolved deck display
-        sorted_evolved_deck = sorted(self.evolved_deck_count.items(), key=lambda x: self.get_card_cost(x[0]))
-        for card, count in sorted_evolved_deck:
-            card_cost = self.get_card_cost(card)
-            display_name = f"({card_cost}) {card}"
-            self.evolved_deck_listbox.insert(tk.END, f"{display_name} ({count})")
+        for card_cost, card, count in self.deck.sorted_entries(self.deck.evolved):
+            self.insert_deck_entry(self.evolved_deck_listbox, card_cost, card, count)
+            self.evolved_deck_listbox_cards.append(card)
 
         # Update deck and evolved deck labels with the card counts
-        total_deck_cards = sum(self.deck_count.values())
-        total_evolved_cards = sum(self.evolved_deck_count.values())
+        total_deck_cards = self.deck.total()
+        total_evolved_cards = self.deck.evolved_total()
         self.deck_label.config(text=f"Deck ({total_deck_cards} cards)")
         self.evolved_deck_label.config(text=f"Evolved Deck ({total_evolved_cards} cards)")
 
         # Update the counts of Spells, Amulets, and Followers
         self.update_totals()
+        self.update_suggestions()
+
+    def insert_deck_entry(self, listbox, card_cost, card, count):
+        display_name = f"({card_cost}) {card}"
+        missing = self.deck_missing.get(card)
+        if missing:
+            listbox.insert(tk.END, f"{display_name} ({count}, missing {missing})")
+            listbox.itemconfig(tk.END, foreground=MISSING_HIGHLIGHT)
+        else:
+            listbox.insert(tk.END, f"{display_name} ({count})")
+
+    def selected_deck_card(self):
+        # Card selected in the deck or evolved deck list, None without a selection
+        for listbox, cards in ((self.deck_listbox, self.deck_listbox_cards),
+                               (self.evolved_deck_listbox, self.evolved_deck_listbox_cards)):
+            selection = listbox.curselection()
+            if selection:
+                return cards[selection[0]]
+        return None
+
+    def set_owned_quantity(self):
+        # Record how many copies of the card selected in the deck lists are owned
+        card = self.catalog.get(self.selected_deck_card())
+        if card is None:
+            messagebox.showinfo("Set Owned", "Select a card in the deck lists first")
+            return
+        quantity = simpledialog.askinteger("Set Owned", f"Copies of {card.name} owned:", parent=self.root,
+                                           minvalue=0, initialvalue=self.collection.quantity(card.code))
+        if quantity is not None:
+            self.collection.update({card.code: quantity})
+            self.refresh_after_collection_change()
+
+    def add_deck_to_collection(self):
+        # Count the copies of the current deck as owned, e.g. after buying a pre-constructed deck
+        counts = self.collection.deck_codes(self.deck)
+        if counts and messagebox.askyesno("Own Deck",
+                                          f"Add the {sum(counts.values())} cards of this deck to the collection?"):
+            self.collection.add(counts)
+            self.refresh_after_collection_change()
+
+    def refresh_after_collection_change(self):
+        self.update_deck_display()
+        for card in self.card_labels:
+            self.update_card_background(card)
+        if self.library_window:
+            self.update_library_list()
+
+    def update_suggestions(self):
+        # Rank the cards played alongside the current deck, limited to the deck's classes and Neutral
+        with self.profiler.stage("synergy"):
+            if self.synergy_stale:
+                self.synergy.sync(self.library)
+                self.synergy_stale = False
+            deck_counts = {**self.deck.main, **self.deck.evolved}
+            classes = {card.card_class for card in map(self.catalog.get, deck_counts) if card} | {"Neutral"}
+
+            def allowed(card_name):
+                card = self.catalog.get(card_name)
+                return card is not None and card.card_class in classes
+
+            suggestions = self.synergy.suggest(deck_counts, allowed=allowed) if deck_counts else []
+        self.suggestion_label.config(text=f"Played with this deck ({len(self.synergy)} library decks):")
+        self.suggestion_listbox.delete(0, tk.END)
+        self.suggestion_listbox_cards = []
+        for card, score in suggestions:
+            self.suggestion_listbox.insert(tk.END, f"({self.get_card_cost(card)}) {card} {score:.0%}")
+            self.suggestion_listbox_cards.append(card)
+
+    def add_suggested_card(self, event):
+        selection = self.suggestion_listbox.curselection()
+        if selection:
+            self.add_to_deck(event, self.suggestion_listbox_cards[selection[0]])
 
     def update_card_background(self, card):
         # Update the background color of card images without refreshing the whole card list
-        if card in self.card_labels:
-            if card in self.deck_count or card in self.evolved_deck_count:
-                self.card_labels[card].config(background="yellow")
-            else:
-                self.card_labels[card].config(background="")
+        card_label = self.card_labels.get(card)
+        if card_label is None:
+            return
+        if card in self.deck_missing:
+            highlighted = MISSING_HIGHLIGHT
+        elif card in self.deck_count or card in self.evolved_deck_count:
+            highlighted = DECK_HIGHLIGHT
+        else:
+            highlighted = None
+        if card_label.highlighted == highlighted:
+            return
+        card_label.highlighted = highlighted
+        if highlighted:
+            card_label.config(borderwidth=2, relief="solid", background=highlighted)
+        else:
+            card_label.config(borderwidth=0, relief="flat", background="")
+
+    def refresh_after_deck_change(self, changed_cards):
+        # Only the deck filter depends on the deck contents, otherwise just re-highlight what changed
+        if self.show_only_in_deck_var.get():
+            self.update_card_list()
+        else:
+            for card in changed_cards:
+                self.update_card_background(card)
 
     def update_totals(self):
         # Update the counts of Spells, Amulets, and Followers in the regular deck
-        spell_count = sum(count for card, count in self.deck_count.items() if self.get_card_type(card) == "Spell")
-        amulet_count = sum(count for card, count in self.deck_count.items() if self.get_card_type(card) == "Amulet")
-        follower_count = sum(count for card, count in self.deck_count.items() if self.get_card_type(card) == "Follower")
-        self.deck_totals_label.config(text=f"Spells: {spell_count}, Amulets: {amulet_count}, Followers: {follower_count}")
+        type_counts = self.deck.type_counts()
+        self.deck_totals_label.config(
+            text=f"Spells: {type_counts['Spell']}, Amulets: {type_counts['Amulet']}, Followers: {type_counts['Follower']}")
+        self.update_deck_stats()
 
-    def get_card_type(self, card_name):
-        # Retrieve the type of a card from the database
-        self.c.execute("SELECT type FROM cards WHERE name=?", (card_name,))
-        result = self.c.fetchone()
-        return result[0] if result else ""
+    def select_stats_card(self, event):
+        # Show the draw odds of the deck entry selected in the listbox
+        selection = self.deck_listbox.curselection()
+        if selection:
+            self.selected_stats_card = self.deck_listbox_cards[selection[0]]
+            self.update_deck_stats()
+
+    def update_deck_stats(self):
+        # Refresh the analytics panel from the current deck
+        stats = DeckStats(self.deck, going_second=self.going_second_var.get())
+        curve = " ".join(f"{cost}:{count}" for cost, count in sorted(stats.cost_curve.items()))
+        lines = [f"Avg cost {stats.average_cost:.2f} | Curve {curve}",
+                 "Classes: " + ", ".join(f"{name} {count}" for name, count in stats.classes.most_common()),
+                 "Traits: " + ", ".join(f"{name} {count}" for name, count in stats.traits.most_common(5)),
+                 f"{'P(>=1) by turn':<24}" + "".join(f"{f'T{turn}':>5}" for turn in range(1, STATS_TURNS + 1))]
+        rows = [(f"{copies} cop{'y' if copies == 1 else 'ies'}", stats.draw_odds(copies)) for copies in (1, 2, 3)]
+        if self.selected_stats_card in self.deck.main:
+            card_label = f"{self.selected_stats_card} (x{self.deck.main[self.selected_stats_card]})"
+            rows.append((card_label[:23], stats.card_odds(self.selected_stats_card)))
+        for label, odds in rows:
+            lines.append(f"{label:<24}" + "".join(f"{p:>5.0%}" for p in odds))
+        self.deck_stats_label.config(text="\n".join(lines))
+        if self.simulation_generation:
+            # A shown simulation no longer matches the deck
+            self.simulation_generation += 1
+            self.simulation_label.config(text="")
 
     def get_card_cost(self, card_name):
-        # Retrieve the cost of a card from the database
-        self.c.execute("SELECT cost FROM cards WHERE name=?", (card_name,))
-        result = self.c.fetchone()
-        return result[0] if result else 0
-
-    def get_card_evolved(self, card_name):
-        # Retrieve if a card is evolved from the database
-        self.c.execute("SELECT evolved FROM cards WHERE name=?", (card_name,))
-        result = self.c.fetchone()
-        return result[0] if result else 'no'
+        # Retrieve the cost of a card from the catalog
+        card = self.catalog.get(card_name)
+        return card.cost if card else 0
+
+    def start_simulation(self):
+        # Simulate shuffles of the current deck in the background; a newer run or deck change supersedes it
+        entries = deck_entries(self.deck)
+        if not entries:
+            self.simulation_label.config(text="Add cards to the deck to simulate openings.")
+            return
+        self.simulation_generation += 1
+        generation = self.simulation_generation
+        going_second = self.going_second_var.get()
+        self.simulation_label.config(text="Simulating...")
+        thread = threading.Thread(target=lambda: self.dispatcher.post(
+            self.show_simulation, generation, simulate(entries, seed=generation, going_second=going_second, workers=1)))
+        thread.daemon = True
+        thread.start()
+
+    def show_simulation(self, generation, result):
+        # Display a finished simulation unless it was started for an older deck
+        if generation != self.simulation_generation:
+            return
+        curve = " ".join(f"T{turn}:{rate:.0%}" for turn, rate in result['on_curve'].items())
+        late = sorted(result['on_time'].items(), key=lambda item: item[1])[:3]
+        self.simulation_label.config(text="\n".join([
+            f"{result['trials']} games, mulligan {result['mulligan_rate']:.0%}, "
+            f"curve out T{CURVE_TURNS[0]}-T{CURVE_TURNS[-1]} {result['curve_out_rate']:.0%}",
+            f"On curve: {curve}",
+            "Often late: " + ", ".join(f"{name} {rate:.0%}" for name, rate in late),
+        ]))
 
     def export_deck(self):
-        # Export the current deck to a text file
-        filename = filedialog.asksaveasfilename(defaultextension=".txt", filetypes=[("Text files", "*.txt")])
+        # Export the current deck to a text file, or a binary deck file by extension
+        filename = filedialog.asksaveasfilename(defaultextension=".txt", filetypes=[
+            ("Text files", "*.txt"), ("Binary deck files", f"*{BINARY_EXTENSION}")])
         if filename:
-            with open(filename, "w") as file:
-                file.write("Deck:\n")
-                for card_name, count in self.deck_count.items():
-                    file.write(f"x{count} {card_name} \n")
-                file.write("\nEvolved Deck:\n")
-                for card_name, count in self.evolved_deck_count.items():
-                    file.write(f"x{count} {card_name} \n")
+            try:
+                self.deck.save(filename)
+            except ValueError as e:
+                messagebox.showerror("Export Deck", str(e))
+                return
             messagebox.showinfo("Export Deck", f"Deck has been exported to {filename}")
 
     def import_deck(self):
-        # Import a deck from a text file
-        filename = filedialog.askopenfilename(filetypes=[("Text files", "*.txt")])
+        # Import a deck from a text or binary deck file
+        filename = filedialog.askopenfilename(filetypes=[
+            ("Deck files", f"*.txt *{BINARY_EXTENSION}"), ("Text files", "*.txt"),
+            ("Binary deck files", f"*{BINARY_EXTENSION}")])
         if filename:
             try:
-                with open(filename, "r") as file:
-                    content = file.read().splitlines()
-                self.deck_count.clear()
-                self.evolved_deck_count.clear()
-                current_dict = None
-                for line in content:
-                    if line.startswith("Deck:"):
-                        current_dict = self.deck_count
-                    elif line.startswith("Evolved Deck:"):
-                        current_dict = self.evolved_deck_count
-                    elif line.startswith("x"):
-                        count, card_name = line.split(" ", 1)
-                        card_name = card_name.strip()
-                        count = int(count[1:])
-                        if current_dict is not None:
-                            current_dict[card_name] = count
-                self.update_deck_display()
-                self.update_card_list()
+                self.load_deck(Deck.load(self.catalog, filename))
                 messagebox.showinfo("Import Deck", f"Deck has been imported from {filename}")
             except FileNotFoundError:
                 messagebox.showerror("Import Deck", "File not found")
+            except ValueError as e:
+                messagebox.showerror("Import Deck", str(e))
+
+    def load_deck(self, imported):
+        # Replace the current deck and refresh everything showing it
+        previous_cards = self.deck.card_names()
+        self.deck.replace(imported)
+        self.update_deck_display()
+        self.refresh_after_deck_change(previous_cards | self.deck.card_names())
+
+    def copy_deck_code(self):
+        # Put the deck code of the current deck on the clipboard
+        try:
+            code = self.deck.to_code()
+        except ValueError as e:
+            messagebox.showerror("Copy Deck Code", str(e))
+            return
+        self.root.clipboard_clear()
+        self.root.clipboard_append(code)
+        messagebox.showinfo("Copy Deck Code", "Deck code has been copied to the clipboard")
+
+    def paste_deck_code(self):
+        # Replace the current deck with the deck code on the clipboard
+        try:
+            self.load_deck(Deck.from_code(self.catalog, self.root.clipboard_get()))
+        except (tk.TclError, ValueError) as e:
+            messagebox.showerror("Paste Deck Code", f"No valid deck code on the clipboard: {e}")
 
     def clear_decks(self):
         # Clear both the regular and evolved decks
-        self.deck_count.clear()
-        self.evolved_deck_count.clear()
+        previous_cards = self.deck.card_names()
+        self.deck.clear()
         self.update_deck_display()
-        self.update_card_list()
+        self.refresh_after_deck_change(previous_cards)
+
+    def save_to_library(self):
+        # Store the current deck in the deck library under a name
+        name = simpledialog.askstring("Save to Library", "Deck name:", parent=self.root)
+        if name:
+            self.library.add(self.deck, name)
+            self.synergy_stale = True
+            if self.library_window:
+                self.update_library_list()
+            self.update_suggestions()
+
+    def import_library_folder(self):
+        # Store every deck file of a folder (and its subfolders) in the library
+        folder = filedialog.askdirectory(title="Import Decks into Library", parent=self.library_window)
+        if not folder:
+            return
+        imported, errors = self.library.import_files(list(expand_deck_paths([folder])))
+        self.synergy_stale = True
+        self.update_library_list()
+        self.update_suggestions()
+        message = f"Imported {imported} deck(s) from {folder}"
+        if errors:
+            message += f"\n{len(errors)} file(s) could not be read, e.g. {errors[0][0]}: {errors[0][1]}"
+        messagebox.showinfo("Import Decks", message, parent=self.library_window)
+
+    def open_library(self):
+        # Window listing stored decks by class or by a card they play; double-click loads a deck
+        if self.library_window:
+            self.library_window.lift()
+            return
+        self.library_window = tk.Toplevel(self.root)
+        self.library_window.title("Deck Library")
+        self.library_window.protocol("WM_DELETE_WINDOW", self.close_library)
+
+        search_frame = tk.Frame(self.library_window)
+        search_frame.pack(fill=tk.X, padx=5, pady=5)
+        ttk.Label(search_frame, text="Class:").pack(side=tk.LEFT)
+        self.library_class_var = tk.StringVar()
+        library_class_combobox = ttk.Combobox(search_frame, textvariable=self.library_class_var,
+                                              values=[""] + self.get_class(), state="readonly")
+        library_class_combobox.pack(side=tk.LEFT, padx=5)
+        library_class_combobox.bind("<<ComboboxSelected>>", lambda event: self.update_library_list())
+        ttk.Label(search_frame, text="Uses card:").pack(side=tk.LEFT)
+        self.library_card_var = tk.StringVar()
+        library_card_entry = ttk.Entry(search_frame, textvariable=self.library_card_var)
+        library_card_entry.pack(side=tk.LEFT, padx=5)
+        library_card_entry.bind("<Return>", lambda event: self.update_library_list())
+        self.library_buildable_var = tk.BooleanVar()
+        ttk.Checkbutton(search_frame, text="Buildable first", variable=self.library_buildable_var,
+                        command=self.update_library_list).pack(side=tk.LEFT, padx=5)
+        ttk.Button(search_frame, text="Import Folder", command=self.import_library_folder).pack(side=tk.LEFT, padx=5)
+
+        self.library_listbox = tk.Listbox(self.library_window, height=20, width=60)
+        self.library_listbox.pack(fill=tk.BOTH, expand=True, padx=5)
+        self.library_listbox.bind("<Double-Button-1>", self.load_library_deck)
+        self.library_listbox.bind("<<ListboxSelect>>", self.show_library_shortfall)
+        self.library_listbox_ids = []
+        self.library_short_label = ttk.Label(self.library_window, justify=tk.LEFT, wraplength=450)
+        self.library_short_label.pack(fill=tk.X, padx=5)
+        self.library_top_label = ttk.Label(self.library_window, justify=tk.LEFT, wraplength=450)
+        self.library_top_label.pack(fill=tk.X, padx=5, pady=5)
+        self.update_library_list()
+
+    def close_library(self):
+        self.library_window.destroy()
+        self.library_window = None
+
+    def update_library_list(self):
+        # List the decks matching the class and card of the library window
+        card_name = self.library_card_var.get().strip()
+        card_class = self.library_class_var.get()
+        if card_name:
+            rows = [row for row in self.library.decks_using(card_name) if not card_class or row[2] == card_class]
+            entries = [(deck_id, f"{name} [{deck_class}] x{copies}") for deck_id, name, deck_class, copies in rows]
+        elif self.library_buildable_var.get():
+            # Every deck against the collection in one query, buildable decks first
+            rows = [row for row in self.library.buildable(max_missing=None) if not card_class or row[2] == card_class]
+            entries = [(deck_id, f"{name} [{deck_class}] {f'missing {missing} of {cards}' if missing else 'buildable'}")
+                       for deck_id, name, deck_class, cards, missing in rows]
+        else:
+            entries = [(deck_id, f"{name} [{deck_class}] ({cards} cards)")
+                       for deck_id, name, deck_class, cards in self.library.decks(card_class or None)]
+        self.library_listbox.delete(0, tk.END)
+        self.library_listbox_ids = []
+        for deck_id, text in entries:
+            self.library_listbox.insert(tk.END, text)
+            self.library_listbox_ids.append(deck_id)
+        top = ", ".join(f"{name} ({decks})" for name, decks, _ in self.library.most_played(10))
+        self.library_top_label.config(text=f"{len(self.library)} decks. Most played: {top}")
+
+    def show_library_shortfall(self, event):
+        # List what the collection lacks for the selected library deck
+        selection = self.library_listbox.curselection()
+        if not selection:
+            return
+        shortfall = self.library.shortfall([self.library_listbox_ids[selection[0]]])
+        if shortfall:
+            self.library_short_label.config(
+                text="Short: " + ", ".join(f"{card_name} x{missing}" for card_name, missing in shortfall))
+        else:
+            self.library_short_label.config(text="Buildable from the collection.")
+
+    def load_library_deck(self, event):
+        # Replace the current deck with the selected library deck
+        selection = self.library_listbox.curselection()
+        if selection:
+            deck = self.library.get(self.library_listbox_ids[selection[0]])
+            if deck:
+                self.load_deck(deck)
+
+    def create_debug_overlay(self):
+        # Status overlay in the corner of the card grid; F12 exports the collected trace
+        self.debug_overlay = tk.Label(self.card_frame, justify=tk.LEFT, anchor="nw", font=("TkFixedFont", 9),
+                                      background="black", foreground="lime")
+        self.debug_overlay.place(relx=1.0, x=-20, y=0, anchor="ne")
+        self.root.bind("<F12>", self.export_trace)
+        self.update_debug_overlay()
+
+    def update_debug_overlay(self):
+        lines = self.profiler.summary_lines()
+        stats = self.card_images.stats()
+        lines.append(f"thumbnails: {stats['entries']} cached, {stats['bytes'] // 1024} KiB, "
+                     f"hits {stats['hits']} / misses {stats['misses']} / evictions {stats['evictions']}")
+        self.debug_overlay.config(text="\n".join(lines))
+        self.root.after(DEBUG_OVERLAY_MS, self.update_debug_overlay)
+
+    def export_trace(self, event=None):
+        # Save the profiler events as a Chrome trace file
+        filename = filedialog.asksaveasfilename(defaultextension=".json", filetypes=[("Trace files", "*.json")])
+        if filename:
+            self.profiler.export(filename)
+            messagebox.showinfo("Export Trace", f"Trace has been exported to {filename}")
 
     def _on_mousewheel(self, event):
         # Scroll the canvas with the mouse wheel
@@ -560,7 +1413,11 @@ class DeckBuilderApp:
         self.tooltip.wm_overrideredirect(True)
         x, y = event.widget.winfo_pointerxy()
         self.tooltip.geometry(f"+{x}+{y}")
-        label = ttk.Label(self.tooltip, text=card_name, background="black", foreground="white", relief="solid", borderwidth=1)
+        text = card_name
+        card = self.catalog.get(card_name)
+        if len(self.collection) and card:
+            text += f"\nOwned: {self.collection.quantity(card.code)}"
+        label = ttk.Label(self.tooltip, text=text, background="black", foreground="white", relief="solid", borderwidth=1)
         label.pack()
 
     def hide_card_name(self, event):
@@ -568,41 +1425,32 @@ class DeckBuilderApp:
         if hasattr(self, 'tooltip'):
             self.tooltip.destroy()
 
-def parse_card_file(filenames):
-    # Parse the card data from JSON files
-    cards = []
-    for filename in filenames:
-        with open(filename, 'r') as file:
-            card_data = json.load(file)
-        for card in card_data:
-            cards.append(card)
-    return cards
-
-def create_database(cards, db_name='cards.db'):
-    # Create the SQLite database and populate it with card data
-    conn = sqlite3.connect(db_name)
-    c = conn.cursor()
-    c.execute('''DROP TABLE IF EXISTS cards''')
-    c.execute('''CREATE TABLE cards
-                 (name TEXT, cost INTEGER, attack INTEGER, defense INTEGER, type TEXT, 
-                 universe TEXT, rarity TEXT, code TEXT, class TEXT, trait TEXT, evolved TEXT, card_set TEXT)''')
-    for card in cards:
-        c.execute('''INSERT INTO cards VALUES (?,?,?,?,?,?,?,?,?,?,?,?)''', 
-              (card['name'], int(card.get('cost', 0)), 
-               int(card.get('attack', None)) if card.get('attack') else None,
-               int(card.get('defense', None)) if card.get('defense') else None,
-               card['type'], card['universe'], card['rarity'], card['code'], 
-               card['class'], card.get('trait', ''), card['evolved'], card.get('card_set', '')))
-    conn.commit()
-    conn.close()
-
 if __name__ == "__main__":
-    # Load card data and create the database
-    card_files = glob.glob("sets_db/*.json")
-    cards = parse_card_file(card_files)
-    create_database(cards)
-
-    # Create the main application window and run the application
+    started = time.perf_counter()
+    parser = argparse.ArgumentParser(description="Shadowverse Evolve deck builder")
+    parser.add_argument("--rebuild", action="store_true", help="drop and re-import every set file")
+    parser.add_argument("--debug", action="store_true", help="show the profiling overlay (F12 exports a trace)")
+    parser.add_argument("--trace", help="write a Chrome trace file on exit (implies --debug)")
+    args = parser.parse_args()
+    profiler = Profiler(enabled=args.debug or bool(args.trace))
+
+    # Start from the catalog snapshot while the set files match it, otherwise bring the database
+    # up to date and snapshot the catalog for the next start
+    card_files = sorted(glob.glob("sets_db/*.json"))
+    catalog = None if args.rebuild else load_catalog_snapshot(card_files)
+    if catalog is None:
+        imported = build_database(card_files, rebuild=args.rebuild)
+        print(f"Imported {len(imported)} changed set file(s)." if imported else "Card database is up to date.")
+        catalog = CardCatalog.load()
+        save_catalog_snapshot(catalog, card_files)
+    else:
+        print("Card database is up to date.")
+
+    # Create the main application window and run the application; thumbnails are generated and
+    # packed in the background once it is up
     root = tk.Tk()
-    app = DeckBuilderApp(root)
+    app = DeckBuilderApp(root, profiler, catalog)
+    root.after_idle(lambda: print(f"Window ready in {(time.perf_counter() - started) * 1000:.0f} ms."))
     root.mainloop()
+    if args.trace:
+        profiler.export(args.trace)
@@ -0,0 +1,118 @@
+import json
+import os
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+
+class Profiler:
+    # Collects stage timings, SQL counts per user action, gauges and latency samples for the
+    # debug overlay, and keeps them as Chrome trace events (chrome://tracing, Perfetto).
+    # The current action is tracked per thread, so queries on database worker threads are
+    # attributed to the action running there. When disabled every hook is a no-op.
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self.start = time.perf_counter()
+        self.events = []
+        self.last_stage_ms = {}
+        self.gauges = {}
+        self.latency_totals = Counter()
+        self.latency_counts = Counter()
+        self.local = threading.local()
+        self.last_action_queries = {}
+
+    def timestamp(self):
+        # Microseconds since the profiler started, as used by the trace format
+        return (time.perf_counter() - self.start) * 1e6
+
+    def add_event(self, event):
+        event.setdefault('pid', os.getpid())
+        event.setdefault('tid', threading.get_ident())
+        with self.lock:
+            self.events.append(event)
+
+    def stage(self, name):
+        # Context manager timing one stage of a refresh
+        if not self.enabled:
+            return nullcontext()
+        return self.timed(name, 'stage')
+
+    def action(self, name):
+        # Context manager around a user action; SQL statements run inside it are attributed to it
+        if not self.enabled:
+            return nullcontext()
+        return self.timed(name, 'action')
+
+    @property
+    def current_action(self):
+        return getattr(self.local, 'action', None)
+
+    @contextmanager
+    def timed(self, name, category):
+        outer_action = self.current_action
+        if category == 'action' and outer_action is None:
+            self.local.action = name
+            self.local.queries = 0
+        begin = self.timestamp()
+        try:
+            yield
+        finally:
+            duration = self.timestamp() - begin
+            args = {}
+            if category == 'action' and outer_action is None:
+                self.local.action = None
+                self.last_action_queries[name] = self.local.queries
+                args['sql_queries'] = self.local.queries
+            else:
+                self.last_stage_ms[name] = duration / 1000
+            self.add_event({'name': name, 'cat': category, 'ph': 'X', 'ts': begin, 'dur': duration, 'args': args})
+
+    def count_query(self, statement):
+        # sqlite3 trace callback, called for every statement executed on the connection
+        self.local.queries = getattr(self.local, 'queries', 0) + 1
+        self.add_event({'name': 'sql', 'cat': 'sql', 'ph': 'i', 's': 't', 'ts': self.timestamp(),
+                        'args': {'statement': statement, 'action': self.current_action}})
+
+    def gauge(self, name, value):
+        # Record the current value of something like a queue depth
+        if not self.enabled:
+            return
+        self.gauges[name] = value
+        self.add_event({'name': name, 'ph': 'C', 'ts': self.timestamp(), 'args': {name: value}})
+
+    def latency(self, name, milliseconds):
+        # Record one latency sample (callable from worker threads)
+        if not self.enabled:
+            return
+        with self.lock:
+            self.latency_totals[name] += milliseconds
+            self.latency_counts[name] += 1
+        self.add_event({'name': name, 'cat': 'latency', 'ph': 'X', 'ts': self.timestamp() - milliseconds * 1000,
+                        'dur': milliseconds * 1000})
+
+    def average_latency(self, name):
+        count = self.latency_counts[name]
+        return self.latency_totals[name] / count if count else 0.0
+
+    def summary_lines(self):
+        # Human readable state for the overlay; worker threads keep recording, so work on copies
+        stages = list(self.last_stage_ms.items())
+        action_queries = list(self.last_action_queries.items())
+        with self.lock:
+            latencies = [(name, self.latency_totals[name] / count, count) for name, count in self.latency_counts.items()]
+        lines = [" | ".join(f"{name} {ms:.1f} ms" for name, ms in stages) or "no refresh yet"]
+        if action_queries:
+            lines.append("SQL per action: " + ", ".join(f"{name}={count}" for name, count in action_queries))
+        for name, value in list(self.gauges.items()):
+            lines.append(f"{name}: {value}")
+        for name, average, count in latencies:
+            lines.append(f"{name}: avg {average:.1f} ms over {count}")
+        return lines
+
+    def export(self, filename):
+        # Write the collected events as a Chrome trace file
+        with self.lock:
+            events = list(self.events)
+        with open(filename, 'w') as file:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, file)
@@ -0,0 +1,88 @@
+import os
+import random
+
+from deck_stats import OPENING_HAND, cards_seen
+
+# Default number of simulated games and how many of them one task runs
+SIM_TRIALS = 20000
+SIM_CHUNK = 2500
+# Turns reported for on-curve rates; a game curves out when it is on curve on every CURVE_TURNS turn
+SIM_TURNS = 6
+CURVE_TURNS = (2, 3, 4)
+# Opening hands without a card this cheap are mulliganed (shuffled back for a fresh hand)
+MULLIGAN_MAX_COST = 2
+# Below this many trials a process pool costs more than it saves
+PARALLEL_THRESHOLD = 10000
+
+def deck_entries(deck):
+    # (name, cost, copies) of the main deck, the input of the simulator
+    return [(card_name, cost, count) for cost, card_name, count in deck.sorted_entries(deck.main)]
+
+def simulate_chunk(entries, trials, seed, going_second=False, mulligan_max_cost=MULLIGAN_MAX_COST):
+    # Play out the opening turns of `trials` shuffles and return raw hit counts
+    rng = random.Random(seed)
+    library = [card_id for card_id, (_, _, count) in enumerate(entries) for _ in range(count)]
+    costs = [cost for _, cost, _ in entries]
+    seen_by_turn = [cards_seen(turn, going_second) for turn in range(SIM_TURNS + 1)]
+    # A card arrives on time when it has been drawn by the turn matching its cost
+    on_time_limit = [cards_seen(max(cost, 1), going_second) for cost in costs]
+    horizon = min(len(library), max(seen_by_turn[-1], max(on_time_limit)))
+    mulligans = 0
+    on_curve = [0] * (SIM_TURNS + 1)
+    curve_outs = 0
+    on_time = [0] * len(entries)
+    for _ in range(trials):
+        order = rng.sample(library, len(library))
+        if min(costs[card_id] for card_id in order[:OPENING_HAND]) > mulligan_max_cost:
+            mulligans += 1
+            order = rng.sample(library, len(library))
+        first_seen = {}
+        earliest_by_cost = {}
+        for position, card_id in enumerate(order[:horizon]):
+            if card_id not in first_seen:
+                first_seen[card_id] = position
+                cost = costs[card_id]
+                if cost not in earliest_by_cost:
+                    earliest_by_cost[cost] = position
+        curved = True
+        for turn in range(1, SIM_TURNS + 1):
+            # A cost missing from the drawn cards is never on curve, whatever the deck size
+            position = earliest_by_cost.get(turn)
+            hit = position is not None and position < seen_by_turn[turn]
+            on_curve[turn] += hit
+            if turn in CURVE_TURNS and not hit:
+                curved = False
+        curve_outs += curved
+        for card_id, position in first_seen.items():
+            if position < on_time_limit[card_id]:
+                on_time[card_id] += 1
+    return {'trials': trials, 'mulligans': mulligans, 'on_curve': on_curve, 'curve_outs': curve_outs,
+            'on_time': on_time}
+
+def simulate(entries, trials=SIM_TRIALS, seed=0, going_second=False, workers=None):
+    # Run the simulation in fixed-size chunks with per-chunk seeds, so results only depend on
+    # the seed and not on how many processes shared the work
+    if not entries:
+        return None
+    chunks = [min(SIM_CHUNK, trials - start) for start in range(0, trials, SIM_CHUNK)]
+    seeds = [seed * 1000003 + index for index in range(len(chunks))]
+    if trials < PARALLEL_THRESHOLD or workers == 1:
+        results = [simulate_chunk(entries, size, chunk_seed, going_second) for size, chunk_seed in zip(chunks, seeds)]
+    else:
+        # Imported here, the process pool machinery is a noticeable part of the GUI's start-up
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+            results = list(pool.map(simulate_chunk, [entries] * len(chunks), chunks, seeds,
+                                    [going_second] * len(chunks)))
+
+    on_curve = [sum(result['on_curve'][turn] for result in results) for turn in range(SIM_TURNS + 1)]
+    on_time = [sum(result['on_time'][card_id] for result in results) for card_id in range(len(entries))]
+    return {
+        'trials': trials,
+        'seed': seed,
+        'going_second': going_second,
+        'mulligan_rate': sum(result['mulligans'] for result in results) / trials,
+        'on_curve': {turn: on_curve[turn] / trials for turn in range(1, SIM_TURNS + 1)},
+        'curve_out_rate': sum(result['curve_outs'] for result in results) / trials,
+        'on_time': {name: on_time[card_id] / trials for card_id, (name, _, _) in enumerate(entries)},
+    }
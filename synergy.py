@@ -0,0 +1,93 @@
+import heapq
+import math
+from collections import Counter
+from itertools import groupby
+from operator import itemgetter
+
+# Suggestions listed for a deck
+SYNERGY_SUGGESTIONS = 15
+
+class SynergyIndex:
+    # Sparse card co-occurrence matrix over a set of decks: row i counts, for every card j, the
+    # decks playing both i and j, with the diagonal holding the number of decks playing i.
+    # Decks are added and removed incrementally; each one only touches the rows of its own cards.
+    def __init__(self):
+        self.ids = {}
+        self.names = []
+        self.rows = []
+        # Deck key -> card ids, so a deck can be taken out again
+        self.decks = {}
+        # 1 / sqrt(decks playing the card) per card id, recomputed after the matrix changed
+        self.norms = None
+
+    def card_id(self, card_name):
+        card_id = self.ids.get(card_name)
+        if card_id is None:
+            card_id = self.ids[card_name] = len(self.names)
+            self.names.append(card_name)
+            self.rows.append(Counter())
+        return card_id
+
+    def add(self, key, card_names):
+        # Count one deck (any iterable of its card names), replacing a deck added under the same key
+        if key in self.decks:
+            self.remove(key)
+        ids = [self.card_id(card_name) for card_name in set(card_names)]
+        for card_id in ids:
+            self.rows[card_id].update(ids)
+        self.decks[key] = ids
+        self.norms = None
+
+    def remove(self, key):
+        ids = self.decks.pop(key, None)
+        if ids is None:
+            return
+        for card_id in ids:
+            row = self.rows[card_id]
+            row.subtract(ids)
+            for other in ids:
+                if row[other] <= 0:
+                    del row[other]
+        self.norms = None
+
+    def sync(self, library):
+        # Bring the matrix in line with a DeckLibrary, reading only the decks stored or removed
+        # since the last sync. Returns the number of newly indexed decks.
+        current = set(library.deck_keys())
+        for key in [key for key in self.decks if key not in current]:
+            self.remove(key)
+        added = {key[0]: key for key in current if key not in self.decks}
+        for deck_id, rows in groupby(library.deck_card_names(added), key=itemgetter(0)):
+            self.add(added[deck_id], (card_name for _, card_name in rows))
+        for key in added.values():
+            # Decks without cards, so they are not fetched again
+            self.decks.setdefault(key, [])
+        return len(added)
+
+    def __len__(self):
+        return len(self.decks)
+
+    def suggest(self, deck_counts, limit=SYNERGY_SUGGESTIONS, allowed=None):
+        # Cards most often played alongside a deck ({card name: copies}). A card scores the
+        # copy-weighted mean over the deck's cards of their cosine similarity, co-occurrences /
+        # sqrt(decks playing one * decks playing the other), so staples found in every deck do
+        # not drown out real partners. Cards in the deck or rejected by allowed(card name) are
+        # skipped. Returns [(card name, score in 0..1)], best first.
+        if self.norms is None:
+            self.norms = [1 / math.sqrt(row[card_id]) if row[card_id] else 0.0
+                          for card_id, row in enumerate(self.rows)]
+        norms = self.norms
+        scores = {}
+        total = 0
+        for card_name, count in deck_counts.items():
+            total += count
+            card_id = self.ids.get(card_name)
+            if card_id is None:
+                continue
+            weight = count * norms[card_id]
+            for other, together in self.rows[card_id].items():
+                scores[other] = scores.get(other, 0.0) + weight * together * norms[other]
+        names = self.names
+        candidates = ((score, names[other]) for other, score in scores.items()
+                      if names[other] not in deck_counts and (allowed is None or allowed(names[other])))
+        return [(card_name, score / total) for score, card_name in heapq.nlargest(limit, candidates)]
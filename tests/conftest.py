@@ -0,0 +1,57 @@
+import json
+import os
+import sys
+
+import pytest
+
+# The modules live at the repository root rather than in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from card_db import CardCatalog, build_database
+
+def make_card(code, name=None, cost=1, card_type="Follower", card_class="Forestcraft", trait="",
+              evolved="no", card_set=None, rarity="Bronze", universe="Shadowverse"):
+    # One card as it appears in a set file
+    return {"name": name or f"Card {code}", "cost": str(cost), "attack": 1, "defense": 1,
+            "type": card_type, "trait": trait, "universe": universe, "rarity": rarity, "code": code,
+            "class": card_class, "evolved": evolved, "card_set": card_set or code.split("-")[0]}
+
+def write_set(directory, filename, cards, bump=0):
+    # Write a set file; bump moves its mtime so a rewrite within the same second is noticed
+    path = os.path.join(directory, filename)
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(cards, file, indent=4)
+    if bump:
+        stat = os.stat(path)
+        os.utime(path, (stat.st_atime, stat.st_mtime + bump))
+    return path
+
+SAMPLE_CARDS = [
+    make_card("SD01-001", "Aria, Fairy Princess", cost=6, trait="Pixie / Princess", rarity="Legendary"),
+    make_card("SD01-002", "Titania's Sanctuary", cost=2, card_type="Amulet", trait="Pixie"),
+    make_card("SD01-003", "Fairy Whisperer", cost=2, trait="Pixie"),
+    make_card("SD01-004", "Water Fairy", cost=1, trait="Pixie"),
+    make_card("SD01-005", "Forest Bat", cost=3, card_class="Neutral", trait="Beast"),
+    make_card("SD01-006", "Aria, Fairy Princess (Evolved)", cost=6, trait="Pixie / Princess", evolved="yes"),
+    make_card("SD02-001", "Knight Captain", cost=4, card_class="Swordcraft", trait="Officer"),
+    make_card("SD02-002", "Quickblader", cost=1, card_class="Swordcraft", trait="Officer"),
+]
+
+@pytest.fixture
+def set_files(tmp_path):
+    # Two small set files, one per starter deck
+    return [write_set(tmp_path, "00_sd01.json", [card for card in SAMPLE_CARDS if card["code"].startswith("SD01")]),
+            write_set(tmp_path, "01_sd02.json", [card for card in SAMPLE_CARDS if card["code"].startswith("SD02")])]
+
+@pytest.fixture
+def card_db(tmp_path, set_files):
+    # A cards database built from the sample set files
+    db_name = str(tmp_path / "cards.db")
+    errors = []
+    build_database(set_files, db_name, errors=errors)
+    assert errors == []
+    return db_name
+
+@pytest.fixture
+def catalog(card_db):
+    return CardCatalog.load(card_db)
@@ -0,0 +1,198 @@
+import io
+import json
+import sqlite3
+
+import pytest
+
+from card_db import (CardQuery, FacetIndex, FuzzyIndex, SetFileError, build_database, build_thumbnail_atlases,
+                     iter_json_array, load_catalog_snapshot, load_set_file, save_catalog_snapshot)
+from conftest import SAMPLE_CARDS, make_card, write_set
+
+def query(db_name, sql):
+    conn = sqlite3.connect(db_name)
+    try:
+        return conn.execute(sql).fetchall()
+    finally:
+        conn.close()
+
+def card_codes(db_name):
+    return dict(query(db_name, "SELECT code, source FROM cards"))
+
+def test_iter_json_array_across_chunks():
+    text = '[\n{"a": 1},\n  {"b": "x, ]"} ,\n{"c": [1, 2]}\n]'
+    assert list(iter_json_array(io.StringIO(text), chunk_size=3)) == \
+        [(2, {"a": 1}), (3, {"b": "x, ]"}), (4, {"c": [1, 2]})]
+
+def test_iter_json_array_empty():
+    assert list(iter_json_array(io.StringIO(" [ ] "))) == []
+
+@pytest.mark.parametrize("text, line", [
+    ('{"a": 1}', 1),
+    ('[\n{"a": 1}\n{"b": 2}]', 3),
+    ('[\n{"a": 1},\n{"b": }\n]', 3),
+    ('[{"a": 1},', 1),
+])
+def test_iter_json_array_reports_line_of_error(text, line):
+    with pytest.raises(SetFileError) as error:
+        list(iter_json_array(io.StringIO(text), chunk_size=4))
+    assert error.value.line == line
+
+def test_load_set_file_skips_invalid_and_duplicate_cards(tmp_path):
+    path = write_set(tmp_path, "set.json", [make_card("A-1"), {"name": "No code"}, make_card("A-1", "Again"),
+                                            make_card("A-2", cost=-1), make_card("A-3", evolved="maybe")])
+    errors = []
+    duplicates = []
+    cards = list(load_set_file(path, {}, errors, duplicates))
+    assert [card["code"] for card in cards] == ["A-1"]
+    assert cards[0]["cost"] == 1 and cards[0]["evolved"] is False
+    assert len(errors) == 4
+    assert duplicates == ["A-1"]
+    assert errors[0].message == "missing type, code, class"
+    assert errors[1].message == f"duplicate code A-1 (first in {path})"
+
+def test_load_set_file_reports_malformed_file(tmp_path):
+    path = tmp_path / "broken.json"
+    path.write_text('[\n{"name": "A", "type": "Follower", "code": "A-1", "class": "Neutral"},\n{', encoding="utf-8")
+    errors = []
+    assert [card["code"] for card in load_set_file(str(path), {}, errors)] == ["A-1"]
+    assert len(errors) == 1 and errors[0].line == 3
+
+def test_build_database_is_incremental(tmp_path, set_files, card_db):
+    assert build_database(set_files, card_db) == []
+    cards = [make_card("SD02-001", "Knight Captain", cost=5, card_class="Swordcraft")]
+    write_set(tmp_path, "01_sd02.json", cards, bump=10)
+    assert build_database(set_files, card_db) == [set_files[1]]
+    costs = dict(query(card_db, "SELECT name, cost FROM cards"))
+    assert costs["Knight Captain"] == 5
+    assert "Quickblader" not in costs
+    assert len(costs) == 7
+
+def test_build_database_drops_removed_files(set_files, card_db):
+    build_database(set_files[:1], card_db)
+    assert set(card_codes(card_db).values()) == {set_files[0]}
+
+def test_build_database_skips_touched_files(tmp_path, set_files, card_db):
+    write_set(tmp_path, "00_sd01.json", [card for card in SAMPLE_CARDS if card["code"].startswith("SD01")], bump=10)
+    assert build_database(set_files, card_db) == []
+
+def test_build_database_rebuilds_on_request(set_files, card_db):
+    assert build_database(set_files, card_db, rebuild=True) == set_files
+    assert len(card_codes(card_db)) == 8
+
+def test_incremental_build_matches_full_build_with_duplicate_codes(tmp_path):
+    first = write_set(tmp_path, "00_a.json", [make_card("X-1", "Original")])
+    second = write_set(tmp_path, "01_b.json", [make_card("Y-1")])
+    db_name = str(tmp_path / "incremental.db")
+    build_database([first, second], db_name, errors=[])
+
+    # The second file starts defining a code of the first, then the first drops it again
+    errors = []
+    write_set(tmp_path, "01_b.json", [make_card("Y-1"), make_card("X-1", "Copy")], bump=10)
+    build_database([first, second], db_name, errors=errors)
+    assert [error.message for error in errors] == [f"duplicate code X-1 (first in {first})"]
+    assert card_codes(db_name)["X-1"] == first
+
+    write_set(tmp_path, "00_a.json", [make_card("Z-1")], bump=10)
+    build_database([first, second], db_name, errors=[])
+    full = str(tmp_path / "full.db")
+    build_database([first, second], full, errors=[])
+    assert card_codes(db_name) == card_codes(full)
+    assert card_codes(db_name)["X-1"] == second
+
+def test_build_database_reports_errors(tmp_path):
+    path = write_set(tmp_path, "set.json", [make_card("A-1"), make_card("A-2", cost="two")])
+    errors = []
+    build_database([path], str(tmp_path / "cards.db"), errors=errors)
+    # Line of the card's opening brace, each card takes 14 lines after the "["
+    assert errors == [(path, 16, "cost must be a number, got 'two'")]
+
+def test_card_query_filters_and_sorts(card_db):
+    conn = sqlite3.connect(card_db)
+    try:
+        query = CardQuery(conn)
+        assert query.search({"class": "Swordcraft"}) == [("Quickblader", 1), ("Knight Captain", 4)]
+        assert [row[0] for row in query.search({"cost": 2}, sort_option="Alphabetical")] == \
+            ["Fairy Whisperer", "Titania's Sanctuary"]
+        assert [row[0] for row in query.search({}, name_filter="fairy", trait_filter="princess")] == \
+            ["Aria, Fairy Princess", "Aria, Fairy Princess (Evolved)"]
+        assert query.search({"evolved": "yes"}, columns="code") == [("SD01-006",)]
+        assert query.search({"type": "Amulet"}, names=["Water Fairy"]) == []
+        assert [row[0] for row in query.search({}, sort_option="Release Order")][:2] == \
+            ["Aria, Fairy Princess", "Titania's Sanctuary"]
+    finally:
+        conn.close()
+
+def test_facet_counts_ignore_their_own_selection(catalog):
+    facets = FacetIndex(catalog)
+    counts = facets.counts({"class": "Forestcraft", "cost": 2})
+    assert counts["class"] == {"Forestcraft": 2, "Neutral": 0, "Swordcraft": 0}
+    assert counts["cost"][2] == 2 and counts["cost"][6] == 2 and counts["cost"][4] == 0
+    assert counts["type"] == {"Follower": 1, "Amulet": 1}
+    assert facets.counts({}, name_filter="FAIRY")["class"]["Forestcraft"] == 4
+    assert facets.counts({}, text_matches=["Forest Bat"])["class"] == {"Forestcraft": 0, "Neutral": 1, "Swordcraft": 0}
+
+def test_facet_counts_match_card_query(card_db, catalog):
+    facets = FacetIndex(catalog)
+    conn = sqlite3.connect(card_db)
+    try:
+        query = CardQuery(conn)
+        counts = facets.counts({"class": "Forestcraft"}, trait_filter="pixie")
+        for cost, count in counts["cost"].items():
+            assert len(query.search({"class": "Forestcraft", "cost": cost}, trait_filter="pixie")) == count
+    finally:
+        conn.close()
+
+def test_fuzzy_search_tolerates_typos_and_punctuation(catalog):
+    fuzzy = FuzzyIndex(catalog)
+    assert fuzzy.search("titanias sanctuery")[0] == "Titania's Sanctuary"
+    assert fuzzy.search("Quikblader") == ["Quickblader"]
+    assert fuzzy.search("aria")[:2] == ["Aria, Fairy Princess", "Aria, Fairy Princess (Evolved)"]
+    assert fuzzy.search("fairy", trait_filter="princes") == \
+        ["Aria, Fairy Princess", "Aria, Fairy Princess (Evolved)"]
+    assert fuzzy.search("zzzz") == []
+    assert fuzzy.search("  ") == []
+
+def test_catalog_snapshot_round_trip(tmp_path, set_files, card_db, catalog):
+    path = str(tmp_path / "cards.snapshot")
+    save_catalog_snapshot(catalog, set_files, path)
+    loaded = load_catalog_snapshot(set_files, path, card_db)
+    assert loaded is not None
+    assert {card.name: card.cost for card in loaded} == {card.name: card.cost for card in catalog}
+
+def test_catalog_snapshot_rejected_when_out_of_date(tmp_path, set_files, card_db, catalog):
+    path = str(tmp_path / "cards.snapshot")
+    save_catalog_snapshot(catalog, set_files, path)
+    assert load_catalog_snapshot(set_files[:1], path, card_db) is None
+    assert load_catalog_snapshot(set_files, str(tmp_path / "missing.snapshot"), card_db) is None
+    assert load_catalog_snapshot(set_files, path, str(tmp_path / "missing.db")) is None
+    write_set(tmp_path, "01_sd02.json", [make_card("SD02-009")], bump=10)
+    assert load_catalog_snapshot(set_files, path, card_db) is None
+
+def test_catalog_snapshot_rejected_for_old_database_schema(tmp_path, set_files, card_db, catalog):
+    path = str(tmp_path / "cards.snapshot")
+    save_catalog_snapshot(catalog, set_files, path)
+    conn = sqlite3.connect(card_db)
+    conn.execute("PRAGMA user_version = 1")
+    conn.close()
+    assert load_catalog_snapshot(set_files, path, card_db) is None
+
+def test_catalog_snapshot_rejected_when_database_was_built_from_other_files(tmp_path, set_files, card_db, catalog):
+    path = str(tmp_path / "cards.snapshot")
+    save_catalog_snapshot(catalog, set_files, path)
+    build_database(set_files[:1], card_db)
+    assert load_catalog_snapshot(set_files, path, card_db) is None
+
+def test_thumbnail_atlases_pack_each_set_once(tmp_path, card_db):
+    Image = pytest.importorskip("PIL.Image")
+    image_dir = tmp_path / "images"
+    image_dir.mkdir()
+    Image.new("RGBA", (3, 2), (1, 2, 3, 4)).save(image_dir / "SD01-001_mini.png")
+    Image.new("RGBA", (2, 2)).save(image_dir / "SD02-001_mini.png")
+    (image_dir / "SD02-002_mini.png").write_bytes(b"not a png")
+    atlas_dir = str(tmp_path / "atlas")
+    assert build_thumbnail_atlases(card_db, str(image_dir), atlas_dir) == ["SD01", "SD02"]
+    with open(tmp_path / "atlas" / "SD02_mini.json") as file:
+        assert json.load(file) == {"cards": {"SD02-001": [0, 2, 2]}, "failed": ["SD02-002"]}
+    assert (tmp_path / "atlas" / "SD01_mini.rgba").read_bytes() == bytes((1, 2, 3, 4)) * 6
+    # Unreadable thumbnails don't make their set repack on every start
+    assert build_thumbnail_atlases(card_db, str(image_dir), atlas_dir) == []
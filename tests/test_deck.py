@@ -0,0 +1,100 @@
+import pytest
+
+from deck import Deck, MAX_COPIES
+from deck_stats import HypergeometricTable, DeckStats
+
+def sample_deck(catalog):
+    deck = Deck(catalog)
+    for card_name, copies in (("Water Fairy", 3), ("Fairy Whisperer", 2), ("Forest Bat", 1),
+                              ("Aria, Fairy Princess (Evolved)", 2)):
+        for _ in range(copies):
+            deck.add(card_name)
+    return deck
+
+def test_add_routes_evolved_cards_and_caps_copies(catalog):
+    deck = sample_deck(catalog)
+    assert deck.main == {"Water Fairy": 3, "Fairy Whisperer": 2, "Forest Bat": 1}
+    assert deck.evolved == {"Aria, Fairy Princess (Evolved)": 2}
+    assert deck.add("Water Fairy") is False and deck.main["Water Fairy"] == MAX_COPIES
+    assert deck.remove("Forest Bat") and "Forest Bat" not in deck.main
+    assert deck.remove("Forest Bat") is False
+
+def test_text_round_trip(catalog):
+    deck = sample_deck(catalog)
+    loaded = Deck.from_text(catalog, deck.to_text())
+    assert (loaded.main, loaded.evolved) == (deck.main, deck.evolved)
+
+@pytest.mark.parametrize("line", ["x3", "xthree Water Fairy", "x3  "])
+def test_from_text_reports_malformed_lines(catalog, line):
+    with pytest.raises(ValueError, match=r"^line 3: expected 'x<count> <name>'$"):
+        Deck.from_text(catalog, f"Deck:\nx1 Forest Bat\n{line}\n")
+
+def test_binary_round_trip_keeps_order(catalog):
+    deck = sample_deck(catalog)
+    deck.add("Knight Captain")
+    loaded = Deck.from_bytes(catalog, deck.to_bytes())
+    assert list(loaded.main.items()) == list(deck.main.items())
+    assert loaded.evolved == deck.evolved
+    code = deck.to_code()
+    assert Deck.from_code(catalog, f" {code[:5]}\n{code[5:]} ").main == deck.main
+
+@pytest.mark.parametrize("mutate, message", [
+    (lambda data: b"XYZ" + data[3:], "not a binary deck"),
+    (lambda data: data[:3] + bytes([99]) + data[4:], "unsupported binary deck version"),
+    (lambda data: data[:-1], "truncated"),
+    (lambda data: data + b"\x00", "trailing data"),
+])
+def test_from_bytes_rejects_corrupt_data(catalog, mutate, message):
+    with pytest.raises(ValueError, match=message):
+        Deck.from_bytes(catalog, mutate(sample_deck(catalog).to_bytes()))
+
+def test_from_code_rejects_unknown_cards(catalog):
+    code = sample_deck(catalog).to_code()
+    with pytest.raises(ValueError, match="unknown card code"):
+        Deck.from_code(type(catalog)([]), code)
+    with pytest.raises(ValueError):
+        Deck.from_code(catalog, "!!!")
+
+def test_save_and_load_pick_the_format(tmp_path, catalog):
+    deck = sample_deck(catalog)
+    for filename in ("deck.txt", "deck.svd"):
+        path = str(tmp_path / filename)
+        deck.save(path)
+        loaded = Deck.load(catalog, path)
+        assert (loaded.main, loaded.evolved) == (deck.main, deck.evolved)
+    assert (tmp_path / "deck.svd").read_bytes() == deck.to_bytes()
+
+def test_validate_reports_misplaced_and_unknown_cards(catalog):
+    deck = Deck(catalog)
+    deck.main["Aria, Fairy Princess (Evolved)"] = 1
+    deck.main["Unknown Card"] = 1
+    deck.evolved["Water Fairy"] = 4
+    assert deck.validate() == [
+        "Deck: 'Aria, Fairy Princess (Evolved)' belongs in the evolved deck",
+        "Deck: unknown card 'Unknown Card'",
+        "Evolved Deck: 4 copies of 'Water Fairy' (max 3)",
+        "Evolved Deck: 'Water Fairy' belongs in the main deck",
+    ]
+
+def test_at_least_matches_hypergeometric_odds():
+    table = HypergeometricTable()
+    assert table.at_least(40, 3, 4) == pytest.approx(1 - (37 * 36 * 35 * 34) / (40 * 39 * 38 * 37))
+    assert table.at_least(40, 0, 10) == 0.0
+    assert table.at_least(40, 3, 40) == 1.0
+    assert table.at_least(5, 2, 3, wanted=3) == 0.0
+    assert table.at_least(80, 3, 4) == pytest.approx(1 - (77 * 76 * 75 * 74) / (80 * 79 * 78 * 77))
+
+def test_at_least_for_empty_and_tiny_decks():
+    table = HypergeometricTable()
+    assert table.at_least(0, 0, 4) == 0.0
+    assert table.at_least(0, 3, 4) == 0.0
+    assert table.at_least(2, 3, 4) == 1.0
+
+def test_deck_stats(catalog):
+    stats = DeckStats(sample_deck(catalog))
+    assert stats.size == 6
+    assert stats.cost_curve == {1: 3, 2: 2, 3: 1}
+    assert stats.average_cost == pytest.approx(10 / 6)
+    assert stats.traits == {"Pixie": 5, "Beast": 1}
+    assert stats.card_odds("Water Fairy")[0] == 1.0
+    assert DeckStats(Deck(catalog)).as_dict()["draw_odds"][1] == [0.0] * 6
@@ -0,0 +1,112 @@
+import pytest
+
+from collection import Collection, read_collection_csv
+from deck import Deck
+from deck_library import DeckLibrary, deck_class
+
+def forest_deck(catalog):
+    deck = Deck(catalog)
+    deck.main.update({"Water Fairy": 3, "Fairy Whisperer": 2, "Forest Bat": 1})
+    deck.evolved.update({"Aria, Fairy Princess (Evolved)": 1})
+    return deck
+
+def sword_deck(catalog):
+    deck = Deck(catalog)
+    deck.main.update({"Quickblader": 3, "Knight Captain": 2, "Forest Bat": 2})
+    return deck
+
+@pytest.fixture
+def collection_db(tmp_path):
+    return str(tmp_path / "collection.db")
+
+@pytest.fixture
+def library(tmp_path, catalog, collection_db):
+    library = DeckLibrary(catalog, str(tmp_path / "decks.db"), collection_db=collection_db)
+    yield library
+    library.close()
+
+def test_deck_class_ignores_neutral_cards(catalog):
+    assert deck_class(forest_deck(catalog)) == "Forestcraft"
+    assert deck_class(Deck(catalog)) == "Neutral"
+
+def test_add_and_search(library, catalog):
+    forest = library.add(forest_deck(catalog), "Forest")
+    sword = library.add(sword_deck(catalog), "Sword")
+    assert len(library) == 2
+    assert library.decks(card_class="Swordcraft") == [(sword, "Sword", "Swordcraft", 7)]
+    assert library.decks_using("Forest Bat") == [(forest, "Forest", "Forestcraft", 1), (sword, "Sword", "Swordcraft", 2)]
+    assert library.most_played(2) == [("Forest Bat", 2, 3), ("Quickblader", 1, 3)]
+    stored = library.get(forest)
+    assert (stored.main, stored.evolved) == (forest_deck(catalog).main, forest_deck(catalog).evolved)
+    assert library.get(forest + sword) is None
+
+def test_remove_updates_usage(library, catalog):
+    forest = library.add(forest_deck(catalog), "Forest")
+    library.add(sword_deck(catalog), "Sword")
+    library.remove(forest)
+    assert sorted(library.most_played()) == [("Forest Bat", 1, 2), ("Knight Captain", 1, 2), ("Quickblader", 1, 3)]
+    assert library.decks_using("Water Fairy") == []
+
+def test_import_replaces_earlier_imports(tmp_path, library, catalog):
+    folder = tmp_path / "decks"
+    folder.mkdir()
+    forest_deck(catalog).save(str(folder / "forest.txt"))
+    sword_deck(catalog).save(str(folder / "sword.svd"))
+    (folder / "broken.svd").write_bytes(b"SVD\x01\x05")
+    paths = [str(folder / name) for name in ("forest.txt", "sword.svd", "broken.svd")]
+    imported, errors = library.import_files(paths)
+    assert imported == 2 and [path for path, _ in errors] == [paths[2]]
+    assert library.import_files(paths[:2])[0] == 2
+    assert len(library) == 2
+    assert library.most_played(1) == [("Forest Bat", 2, 3)]
+
+def test_buildable_and_shortfall(library, catalog, collection_db):
+    forest = library.add(forest_deck(catalog), "Forest")
+    sword = library.add(sword_deck(catalog), "Sword")
+    collection = Collection(collection_db)
+    try:
+        collection.add(collection.deck_codes(forest_deck(catalog)))
+        collection.update({"SD02-002": 3, "SD02-001": 1})
+    finally:
+        collection.close()
+    assert library.buildable() == [(forest, "Forest", "Forestcraft", 7, 0)]
+    assert library.buildable(max_missing=None) == [(forest, "Forest", "Forestcraft", 7, 0),
+                                                   (sword, "Sword", "Swordcraft", 7, 2)]
+    # Forest Bat: one copy owned, the sword deck plays two
+    assert library.shortfall() == [("Forest Bat", 1), ("Knight Captain", 1)]
+    assert library.shortfall([forest]) == []
+    assert library.shortfall([]) == []
+
+def test_buildable_needs_a_collection(tmp_path, catalog):
+    library = DeckLibrary(catalog, str(tmp_path / "decks.db"))
+    try:
+        with pytest.raises(ValueError):
+            library.buildable()
+    finally:
+        library.close()
+
+def test_collection_update_and_missing(collection_db, catalog):
+    collection = Collection(collection_db)
+    try:
+        collection.update({"SD01-004": 2, "SD01-003": 5})
+        collection.add({"SD01-004": 1})
+        collection.update({"SD01-003": 0})
+        assert collection.owned == {"SD01-004": 3}
+        with pytest.raises(ValueError):
+            collection.update({"SD01-004": -1})
+        assert collection.missing(forest_deck(catalog)) == \
+            {"Fairy Whisperer": 2, "Forest Bat": 1, "Aria, Fairy Princess (Evolved)": 1}
+    finally:
+        collection.close()
+    reopened = Collection(collection_db)
+    try:
+        assert reopened.quantity("SD01-004") == 3 and len(reopened) == 1
+    finally:
+        reopened.close()
+
+def test_read_collection_csv(tmp_path):
+    path = tmp_path / "owned.csv"
+    path.write_text("code,quantity\nSD01-001, 2\n\nSD01-002\nSD01-003,x\nSD01-004,-1\nSD01-005,0\n", encoding="utf-8")
+    quantities, errors = read_collection_csv(str(path))
+    assert quantities == {"SD01-001": 2, "SD01-005": 0}
+    assert [line for line, _ in errors] == [4, 5, 6]
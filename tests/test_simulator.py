@@ -0,0 +1,35 @@
+import pytest
+
+from simulator import SIM_TURNS, simulate, simulate_chunk
+
+CURVE_DECK = [("One", 1, 10), ("Two", 2, 10), ("Three", 3, 10), ("Four", 4, 10)]
+
+def test_simulate_is_deterministic_per_seed():
+    first = simulate(CURVE_DECK, trials=3000, seed=7)
+    assert simulate(CURVE_DECK, trials=3000, seed=7) == first
+    assert simulate(CURVE_DECK, trials=3000, seed=8) != first
+    assert simulate([], trials=10) is None
+
+def test_simulate_does_not_depend_on_workers():
+    assert simulate(CURVE_DECK, trials=12000, seed=3, workers=2) == simulate(CURVE_DECK, trials=12000, seed=3, workers=1)
+
+def test_simulate_rates():
+    result = simulate(CURVE_DECK, trials=5000, seed=1)
+    # Mulligan when none of the four opening cards costs 2 or less
+    assert result["mulligan_rate"] == pytest.approx((20 * 19 * 18 * 17) / (40 * 39 * 38 * 37), abs=0.02)
+    assert result["on_curve"][5] == 0.0 and result["on_curve"][6] == 0.0
+    assert 0 < result["curve_out_rate"] <= min(result["on_curve"][turn] for turn in (2, 3, 4))
+    assert set(result["on_time"]) == {"One", "Two", "Three", "Four"}
+
+def test_costs_never_drawn_are_not_on_curve():
+    # Every card of a three-card deck is drawn, costs the deck doesn't hold must still miss
+    result = simulate([("Only", 1, 3)], trials=200, seed=0)
+    assert result["on_curve"] == {1: 1.0, 2: 0.0, 3: 0.0, 4: 0.0, 5: 0.0, 6: 0.0}
+    assert result["curve_out_rate"] == 0.0
+
+def test_simulate_chunk_counts():
+    counts = simulate_chunk([("Two", 2, 4), ("Five", 5, 4)], 100, seed=5)
+    assert counts["trials"] == 100
+    assert len(counts["on_curve"]) == SIM_TURNS + 1
+    assert counts["on_curve"][1] == 0 and counts["on_curve"][3] == 0
+    assert counts["on_curve"][2] == 100
@@ -0,0 +1,68 @@
+import pytest
+
+from synergy import SynergyIndex
+
+DECKS = {
+    "a": ["Fairy", "Sanctuary", "Bat"],
+    "b": ["Fairy", "Sanctuary", "Aria"],
+    "c": ["Knight", "Blader", "Bat"],
+    "d": ["Fairy", "Aria", "Bat"],
+}
+
+def index_of(decks):
+    index = SynergyIndex()
+    for key, card_names in decks.items():
+        index.add(key, card_names)
+    return index
+
+def test_rows_count_co_occurrences():
+    index = index_of(DECKS)
+    fairy = index.rows[index.ids["Fairy"]]
+    assert fairy[index.ids["Fairy"]] == 3
+    assert fairy[index.ids["Sanctuary"]] == 2
+    assert index.ids["Knight"] not in fairy
+
+def test_remove_and_replace_match_a_fresh_index():
+    index = index_of(DECKS)
+    index.remove("a")
+    index.add("c", ["Knight", "Blader"])
+    index.remove("missing")
+    fresh = index_of({"b": DECKS["b"], "c": ["Knight", "Blader"], "d": DECKS["d"]})
+    deck = {"Fairy": 2, "Bat": 1}
+    assert index.suggest(deck) == pytest.approx(fresh.suggest(deck))
+    assert len(index) == 3
+
+def test_suggest_ranks_partners_and_skips_deck_cards():
+    index = index_of(DECKS)
+    # Bat shares as many decks with Fairy as Aria and Sanctuary do, but is played in more decks
+    suggestions = index.suggest({"Fairy": 3})
+    expected = 2 / (3 ** 0.5 * 2 ** 0.5)
+    assert dict(suggestions[:2]) == pytest.approx({"Aria": expected, "Sanctuary": expected})
+    assert suggestions[2] == ("Bat", pytest.approx(2 / 3))
+    assert len(suggestions) == 3
+    assert index.suggest({"Fairy": 1}, allowed=lambda card_name: card_name != "Aria")[0][0] == "Sanctuary"
+    assert index.suggest({"Unknown": 1}) == []
+
+class FakeLibrary:
+    # The two DeckLibrary methods SynergyIndex.sync reads
+    def __init__(self, decks):
+        self.decks = decks
+
+    def deck_keys(self):
+        return list(self.decks)
+
+    def deck_card_names(self, deck_ids):
+        return [(deck_id, card_name) for deck_id, imported in sorted(self.decks)
+                if deck_id in deck_ids for card_name in self.decks[(deck_id, imported)]]
+
+def test_sync_only_reads_changed_decks():
+    library = FakeLibrary({(1, 0.0): DECKS["a"], (2, 0.0): DECKS["b"], (3, 0.0): []})
+    index = SynergyIndex()
+    assert index.sync(library) == 3
+    assert index.sync(library) == 0
+    # Deck 1 removed and its id reused by a newer deck
+    del library.decks[(1, 0.0)]
+    library.decks[(1, 1.0)] = DECKS["c"]
+    assert index.sync(library) == 1
+    fresh = index_of({"b": DECKS["b"], "c": DECKS["c"]})
+    assert index.suggest({"Bat": 1}) == pytest.approx(fresh.suggest({"Bat": 1}))
@@ -0,0 +1,14 @@
+import pytest
+
+Image = pytest.importorskip("PIL.Image")
+
+from thumbnails import THUMBNAIL_SIZES, generate_thumbnails, thumbnail_path
+
+def test_generate_thumbnails_writes_every_variant_once(tmp_path):
+    Image.new("RGB", (480, 672)).save(tmp_path / "SD01-001.png")
+    report = generate_thumbnails(str(tmp_path), workers=1)
+    assert (report['sources'], report['thumbnails'], report['errors']) == (1, len(THUMBNAIL_SIZES), [])
+    for suffix, width in THUMBNAIL_SIZES.items():
+        with Image.open(thumbnail_path(str(tmp_path), "SD01-001", suffix)) as image:
+            assert image.size == (width, round(672 * width / 480))
+    assert generate_thumbnails(str(tmp_path), workers=1)['sources'] == 0
@@ -0,0 +1,106 @@
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image
+
+# Thumbnail variants written next to the full-size art as {code}_{suffix}.png: suffix -> width in
+# pixels, the height follows the art's aspect ratio. "mini" is what the card grid shows, "mini@2x"
+# replaces it on HiDPI screens and "zoom" is opened by the enlarged card view.
+THUMBNAIL_SIZES = {'mini': 120, 'mini@2x': 240, 'zoom': 360}
+# Art files handed to a worker process at a time
+THUMBNAIL_CHUNK = 8
+# Thumbnails are a rebuildable cache (and get packed into atlases), so favour encode speed over size
+THUMBNAIL_COMPRESS_LEVEL = 1
+
+def thumbnail_path(image_dir, code, suffix):
+    return os.path.join(image_dir, f"{code}_{suffix}.png")
+
+def find_sources(image_dir):
+    # Full-size card art is {code}.png; generated and hand-made variants all carry a _suffix
+    sources = {}
+    for path in glob.glob(os.path.join(image_dir, "*.png")):
+        code = os.path.splitext(os.path.basename(path))[0]
+        if "_" not in code:
+            sources[code] = path
+    return sources
+
+def plan_thumbnails(image_dir, sizes=THUMBNAIL_SIZES, force=False):
+    # (source, [(output, width)]) for every art file with a missing or older-than-source variant
+    jobs = []
+    for code, source in sorted(find_sources(image_dir).items()):
+        source_mtime = os.path.getmtime(source)
+        targets = []
+        for suffix, width in sizes.items():
+            output = thumbnail_path(image_dir, code, suffix)
+            if force or not os.path.exists(output) or os.path.getmtime(output) < source_mtime:
+                targets.append((output, width))
+        if targets:
+            jobs.append((source, targets))
+    return jobs
+
+def render_thumbnails(source, targets):
+    # Worker: decode one piece of art once and write each requested width, largest first so every
+    # resize starts from the already reduced image. Returns (source, files written, error).
+    try:
+        with Image.open(source) as image:
+            image.load()
+            if image.mode not in ('RGB', 'RGBA'):
+                image = image.convert('RGBA')
+            for output, width in sorted(targets, key=lambda target: -target[1]):
+                width = min(width, image.width)
+                height = max(1, round(image.height * width / image.width))
+                image = image.resize((width, height), Image.LANCZOS, reducing_gap=3.0)
+                temporary = output + ".tmp"
+                image.save(temporary, format="PNG", compress_level=THUMBNAIL_COMPRESS_LEVEL)
+                os.replace(temporary, output)
+        return source, len(targets), None
+    except Exception as e:
+        return source, 0, str(e)
+
+def generate_thumbnails(image_dir='card_images', sizes=THUMBNAIL_SIZES, workers=None, force=False):
+    # Bring every thumbnail variant up to date across a process pool and report the throughput
+    start = time.perf_counter()
+    jobs = plan_thumbnails(image_dir, sizes, force)
+    written = 0
+    errors = []
+    if jobs:
+        sources = [source for source, _ in jobs]
+        targets = [targets for _, targets in jobs]
+        if workers == 1 or len(jobs) < THUMBNAIL_CHUNK:
+            results = list(map(render_thumbnails, sources, targets))
+        else:
+            # The deck builder calls this from a background thread, and forking a multi-threaded
+            # process (Tk, image loaders) can deadlock the children, so start fresh interpreters
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+                results = list(pool.map(render_thumbnails, sources, targets, chunksize=THUMBNAIL_CHUNK))
+        for source, count, error in results:
+            written += count
+            if error:
+                errors.append({'file': source, 'error': error})
+    seconds = time.perf_counter() - start
+    return {
+        'sources': len(jobs),
+        'thumbnails': written,
+        'errors': errors,
+        'seconds': round(seconds, 3),
+        'sources_per_second': round(len(jobs) / seconds, 1) if jobs and seconds else 0.0,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate card thumbnails from the full-size art")
+    parser.add_argument("--images", default="card_images", help="directory of {code}.png art (default: card_images)")
+    parser.add_argument("--workers", type=int, help="worker processes (default: one per CPU)")
+    parser.add_argument("--force", action="store_true", help="regenerate thumbnails that are up to date")
+    args = parser.parse_args(argv)
+    report = generate_thumbnails(args.images, workers=args.workers, force=args.force)
+    print(json.dumps(report))
+    return 1 if report['errors'] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())